@@ -7,7 +7,7 @@ import sys
 import uuid
 import json
 from datetime import datetime
-from flask import Flask, request, jsonify, render_template, send_from_directory, flash, redirect, url_for
+from flask import Flask, request, jsonify, render_template, send_from_directory, flash, redirect, url_for, abort
 from flask_cors import CORS
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import RequestEntityTooLarge
@@ -48,6 +48,12 @@ def create_app():
     ocr_processor = DeepSeekOCR(config)
     file_validator = FileValidator(config)
     
+    @app.before_request
+    def reject_oversized_request():
+        """Refuse bodies whose declared length exceeds the limit before reading them"""
+        if request.content_length is not None and request.content_length > app.config['MAX_CONTENT_LENGTH']:
+            abort(413)
+    
     # Register error handlers
     @app.errorhandler(413)
     def too_large(e):
@@ -153,6 +159,7 @@ def create_app():
     @app.route('/batch_upload', methods=['POST'])
     def batch_upload():
         """Handle batch file upload and OCR processing"""
+        file_paths = []
         try:
             files = request.files.getlist('files')
             if not files:
@@ -168,7 +175,6 @@ def create_app():
                 prompt = InputValidator.validate_prompt(prompt)
             
             results = []
-            file_paths = []
             
             # Process each file
             for file in files:
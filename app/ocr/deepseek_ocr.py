@@ -7,15 +7,32 @@ import os
 import sys
 import io
 import base64
-import torch
+import hashlib
 from PIL import Image
 from typing import List, Dict, Optional, Union, Tuple
-from transformers import AutoTokenizer, AutoModelForCausalLM
-import cv2
 import numpy as np
 from loguru import logger
 import requests
 import json
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+try:
+    # SIMD base64 codec, drop-in compatible with the stdlib module
+    import pybase64 as b64
+except ImportError:
+    b64 = base64
+
+try:
+    import xxhash
+except ImportError:
+    xxhash = None
 
 # Add the project root to Python path for imports
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
@@ -24,6 +41,31 @@ from app.utils.config import Config
 from app.utils.image_processor import ImageProcessor
 from app.utils.exceptions import OCRError, ModelError
 
+# JPEG quality used when encoding images for the model/API
+JPEG_QUALITY = 85
+
+# Total size of the encoded images kept for repeat submissions
+BASE64_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+
+def _lazy_torch():
+    """Import torch on first use; API-mode callers never pay for it"""
+    import torch
+    return torch
+
+
+def _lazy_transformers():
+    """Import transformers on first use; only the local model needs it"""
+    import transformers
+    return transformers
+
+
+def _content_hash(data: bytes) -> str:
+    """Fast non-cryptographic digest of raw image bytes"""
+    if xxhash is not None:
+        return xxhash.xxh3_64_hexdigest(data)
+    return hashlib.blake2b(data, digest_size=8).hexdigest()
+
 
 class DeepSeekOCR:
     """Main OCR processor using DeepSeek Vision-Language model"""
@@ -32,6 +74,11 @@ class DeepSeekOCR:
         self.config = config
         self.model = None
         self.tokenizer = None
+        self._easyocr_reader = None
+        self._easyocr_lock = threading.Lock()
+        self._base64_cache = OrderedDict()
+        self._base64_cache_bytes = 0
+        self._base64_cache_lock = threading.Lock()
         self.device = self._get_device()
         self.image_processor = ImageProcessor(config)
         self._initialize_model()
@@ -39,7 +86,7 @@ class DeepSeekOCR:
     def _get_device(self) -> str:
         """Determine the best device for model inference"""
         if self.config.model.device == "auto":
-            if torch.cuda.is_available():
+            if _lazy_torch().cuda.is_available():
                 return "cuda"
             else:
                 return "cpu"
@@ -79,8 +126,11 @@ class DeepSeekOCR:
             
             logger.info(f"Loading DeepSeek model from {model_path}")
             
+            transformers = _lazy_transformers()
+            AutoModelForCausalLM = transformers.AutoModelForCausalLM
+            
             # Load tokenizer
-            self.tokenizer = AutoTokenizer.from_pretrained(
+            self.tokenizer = transformers.AutoTokenizer.from_pretrained(
                 model_path,
                 trust_remote_code=True
             )
@@ -89,7 +139,7 @@ class DeepSeekOCR:
             if self.config.model.precision == "fp16":
                 self.model = AutoModelForCausalLM.from_pretrained(
                     model_path,
-                    torch_dtype=torch.float16,
+                    torch_dtype=_lazy_torch().float16,
                     device_map="auto",
                     trust_remote_code=True
                 )
@@ -126,16 +176,34 @@ class DeepSeekOCR:
             Dictionary containing extracted text and metadata
         """
         try:
-            # Load and preprocess image
-            image = self.image_processor.load_image(image_path)
-            
-            # Preprocess if enabled
-            if self.config.ocr.preprocessing.enabled:
-                image = self.image_processor.preprocess_image(image)
+            use_local = self.config.model.use_local and self.model and self.tokenizer
+            source, image, image_b64, cache_key = image_path, None, None, None
+            
+            # The local model needs the encoded image; read the file once so its bytes
+            # can key the encode cache, be sent as-is, or be handed to the decoder
+            if use_local and isinstance(image_path, (str, os.PathLike)):
+                with open(image_path, 'rb') as f:
+                    raw = f.read()
+                source = io.BytesIO(raw)
+                if self.config.performance.cache_enabled:
+                    cache_key = _content_hash(raw)
+                # Without preprocessing, a model-ready JPEG is sent as-is
+                if not self.config.ocr.preprocessing.enabled:
+                    passthrough = self._jpeg_passthrough(raw)
+                    if passthrough is not None:
+                        image, image_b64 = passthrough
+            
+            if image is None:
+                # Load and preprocess image
+                image = self.image_processor.load_image(source)
+                
+                # Preprocess if enabled
+                if self.config.ocr.preprocessing.enabled:
+                    image = self.image_processor.preprocess_image(image)
             
             # Extract text using the appropriate method
-            if self.config.model.use_local and self.model and self.tokenizer:
-                result = self._extract_text_local(image, prompt)
+            if use_local:
+                result = self._extract_text_local(image, prompt, image_b64, cache_key)
             elif not self.config.model.use_local and self.config.api.deepseek_api_key:
                 # Try API first, but fall back to alternative OCR if API doesn't support vision
                 try:
@@ -165,8 +233,10 @@ class DeepSeekOCR:
             logger.error(f"OCR extraction failed for {image_path}: {e}")
             raise OCRError(f"Text extraction failed: {e}")
     
-    def _extract_text_local(self, image: Image.Image, prompt: Optional[str] = None) -> Dict[str, any]:
-        """Extract text using local DeepSeek model"""
+    def _extract_text_local(self, image: Image.Image, prompt: Optional[str] = None,
+                            image_b64: Optional[str] = None,
+                            cache_key: Optional[str] = None) -> Dict[str, any]:
+        """Extract text using local DeepSeek model, optionally with a pre-encoded image"""
         try:
             if not self.model or not self.tokenizer:
                 raise ModelError("Local model not initialized")
@@ -175,8 +245,9 @@ class DeepSeekOCR:
             if prompt is None:
                 prompt = "Extract all text from this image. Provide the text exactly as it appears, maintaining formatting and structure."
             
-            # Convert image to base64 for model input
-            image_b64 = self._image_to_base64(image)
+            # Convert image to base64 for model input unless the source could be used as-is
+            if image_b64 is None:
+                image_b64 = self._image_to_base64(image, cache_key)
             
             # Prepare conversation
             conversation = [
@@ -197,7 +268,7 @@ class DeepSeekOCR:
                 return_tensors="pt"
             ).to(self.device)
             
-            with torch.no_grad():
+            with _lazy_torch().no_grad():
                 outputs = self.model.generate(
                     inputs,
                     max_new_tokens=self.config.model.max_length,
@@ -321,6 +392,16 @@ Image mode: {image.mode}""",
                 "error": str(e)
             }
     
+    def _get_easyocr_reader(self):
+        """Create the EasyOCR reader on first use and reuse it afterwards"""
+        with self._easyocr_lock:
+            if self._easyocr_reader is None:
+                import easyocr
+                
+                # Loading the detection/recognition models takes a while
+                self._easyocr_reader = easyocr.Reader(['en'], verbose=False)
+        return self._easyocr_reader
+    
     def _extract_text_fallback(self, image: Image.Image, prompt: Optional[str] = None) -> Dict[str, any]:
         """Fallback OCR using alternative engines (EasyOCR, Tesseract, etc.)"""
         try:
@@ -329,17 +410,16 @@ Image mode: {image.mode}""",
             # Try EasyOCR first
             try:
                 logger.info("Trying EasyOCR...")
-                import easyocr
-                
-                # Initialize reader (this might take a moment on first run)
-                reader = easyocr.Reader(['en'], verbose=False)
+                reader = self._get_easyocr_reader()
                 
                 # Convert PIL image to numpy array
                 import numpy as np
                 image_np = np.array(image)
                 
-                # Perform OCR
-                results = reader.readtext(image_np, detail=1)
+                # Perform OCR; API-mode batch workers can fall back here concurrently,
+                # and the shared reader is not documented as thread-safe
+                with self._easyocr_lock:
+                    results = reader.readtext(image_np, detail=1)
                 
                 # Extract text from results with confidence filtering
                 text_parts = []
@@ -411,40 +491,107 @@ Image mode: {image.mode}""",
             logger.error(f"Fallback OCR processing failed: {e}")
             return self._extract_text_demo(image, prompt)
     
-    def _image_to_base64(self, image: Image.Image) -> str:
-        """Convert PIL Image to base64 string"""
-        buffer = io.BytesIO()
-        image.save(buffer, format='JPEG')
-        image_b64 = base64.b64encode(buffer.getvalue()).decode()
+    def _jpeg_passthrough(self, raw: bytes) -> Optional[Tuple[Image.Image, str]]:
+        """
+        Header image and base64 of encoded bytes that are already a model-ready JPEG
+        
+        Only the header is parsed, so conformant RGB JPEGs that need no resizing
+        skip the decode/re-encode round trip. Returns None when the bytes must be
+        decoded and re-encoded.
+        """
+        try:
+            # Header parse only; pixel data is not decoded
+            header = Image.open(io.BytesIO(raw))
+        except Exception:
+            return None
+        
+        if header.format != 'JPEG' or header.mode != 'RGB' or max(header.size) > self.config.ocr.max_image_size:
+            return None
+        return header, b64.b64encode(raw).decode('ascii')
+    
+    def _image_to_base64(self, image: Image.Image, cache_key: Optional[str] = None) -> str:
+        """
+        Convert PIL Image to base64 string
+        
+        cache_key is a digest of the source bytes the image was decoded from;
+        when given, the result is reused for repeat submissions of that source.
+        """
+        if cache_key is not None:
+            with self._base64_cache_lock:
+                if cache_key in self._base64_cache:
+                    self._base64_cache.move_to_end(cache_key)
+                    return self._base64_cache[cache_key]
+        
+        image = self.image_processor._resize_image(image, self.config.ocr.max_image_size)
+        image_b64 = self._encode_image(image)
+        
+        if cache_key is not None and len(image_b64) <= BASE64_CACHE_MAX_BYTES:
+            with self._base64_cache_lock:
+                if cache_key not in self._base64_cache:
+                    self._base64_cache[cache_key] = image_b64
+                    self._base64_cache_bytes += len(image_b64)
+                    while self._base64_cache_bytes > BASE64_CACHE_MAX_BYTES:
+                        _, evicted = self._base64_cache.popitem(last=False)
+                        self._base64_cache_bytes -= len(evicted)
+        return image_b64
+    
+    def _encode_image(self, image: Image.Image) -> str:
+        """JPEG-encode an already size-bounded image as base64"""
+        if simplejpeg is not None and image.mode == 'RGB':
+            # libjpeg-turbo encoder, much faster than PIL's save path
+            jpeg_bytes = simplejpeg.encode_jpeg(
+                np.asarray(image),
+                quality=JPEG_QUALITY,
+                colorspace='RGB'
+            )
+        else:
+            buffer = io.BytesIO()
+            image.save(buffer, format='JPEG', quality=JPEG_QUALITY)
+            jpeg_bytes = buffer.getvalue()
+        
+        image_b64 = b64.b64encode(jpeg_bytes).decode('ascii')
         return image_b64
     
     def batch_extract_text(self, image_paths: List[str], prompt: Optional[str] = None) -> List[Dict[str, any]]:
         """
-        Extract text from multiple images
+        Extract text from multiple images, concurrently in API mode
         
         Args:
             image_paths: List of image file paths
             prompt: Optional custom prompt for OCR
             
         Returns:
-            List of dictionaries containing extracted text and metadata
+            List of dictionaries containing extracted text and metadata,
+            in the same order as image_paths
         """
-        results = []
+        if not image_paths:
+            return []
         
-        for image_path in image_paths:
-            try:
-                result = self.extract_text(image_path, prompt)
-                results.append(result)
-            except Exception as e:
-                logger.error(f"Failed to process {image_path}: {e}")
-                results.append({
-                    "image_path": image_path,
-                    "text": "",
-                    "error": str(e),
-                    "success": False
-                })
+        # API requests are I/O-bound and overlap well; the local model and the
+        # fallback engines share one model instance, so they run one image at a time
+        if self.config.model.use_local or not self.config.api.deepseek_api_key:
+            return [self._safe_extract_text(image_path, prompt) for image_path in image_paths]
         
-        return results
+        max_workers = max(1, min(self.config.performance.max_workers, len(image_paths)))
+        
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            return list(executor.map(
+                lambda image_path: self._safe_extract_text(image_path, prompt),
+                image_paths
+            ))
+    
+    def _safe_extract_text(self, image_path: str, prompt: Optional[str] = None) -> Dict[str, any]:
+        """Extract text from one image, reporting failures in the result instead of raising"""
+        try:
+            return self.extract_text(image_path, prompt)
+        except Exception as e:
+            logger.error(f"Failed to process {image_path}: {e}")
+            return {
+                "image_path": image_path,
+                "text": "",
+                "error": str(e),
+                "success": False
+            }
     
     def extract_structured_data(self, image_path: str, structure_prompt: str) -> Dict[str, any]:
         """
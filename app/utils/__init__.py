@@ -2,14 +2,14 @@
 Utilities Package
 """
 
-from .config import get_config, reload_config, Config
+from .config import get_config, reload_config, invalidate_config_cache, Config
 from .exceptions import OCRError, ModelError, ImageProcessingError, ConfigurationError, ValidationError, APIError
 from .image_processor import ImageProcessor
 from .logger import setup_logging, get_logger
 from .validation import FileValidator, InputValidator
 
 __all__ = [
-    "get_config", "reload_config", "Config",
+    "get_config", "reload_config", "invalidate_config_cache", "Config",
     "OCRError", "ModelError", "ImageProcessingError", "ConfigurationError", "ValidationError", "APIError",
     "ImageProcessor",
     "setup_logging", "get_logger",
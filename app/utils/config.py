@@ -10,6 +10,12 @@ from dotenv import load_dotenv
 
 from .exceptions import ConfigurationError
 
+# Prefer the libyaml-backed loader when PyYAML was built with it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
+
 
 @dataclass
 class ModelConfig:
@@ -130,7 +136,7 @@ class ConfigManager:
             if os.path.exists(self.config_path):
                 try:
                     with open(self.config_path, 'r', encoding='utf-8') as f:
-                        config_data = yaml.safe_load(f) or {}
+                        config_data = yaml.load(f, Loader=YamlLoader) or {}
                 except yaml.YAMLError as e:
                     print(f"⚠️  Warning: Error parsing YAML config file: {e}")
                     print("   Using default configuration...")
@@ -320,7 +326,7 @@ _config_manager = None
 
 
 def get_config() -> Config:
-    """Get the global configuration instance"""
+    """Get the global configuration instance, parsing it on first use only"""
     global _config_manager
     if _config_manager is None:
         _config_manager = ConfigManager()
@@ -331,4 +337,10 @@ def reload_config():
     """Reload the global configuration"""
     global _config_manager
     if _config_manager is not None:
-        _config_manager.reload_config()
\ No newline at end of file
+        _config_manager.reload_config()
+
+
+def invalidate_config_cache():
+    """Drop the global configuration so the next get_config() re-parses it"""
+    global _config_manager
+    _config_manager = None
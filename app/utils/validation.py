@@ -2,7 +2,9 @@
 Input validation utilities
 """
 
+import io
 import os
+import re
 import mimetypes
 from typing import List, Optional, Tuple
 from werkzeug.datastructures import FileStorage
@@ -11,6 +13,23 @@ from .config import Config
 from .exceptions import ValidationError
 
 
+# Deletes ASCII control characters other than tab, newline and carriage return
+_SANITIZE_TABLE = str.maketrans('', '', ''.join(chr(c) for c in range(32) if c not in (9, 10, 13)))
+
+_VALID_MIME_TYPES = frozenset({
+    'image/jpeg', 'image/jpg', 'image/png', 'image/bmp',
+    'image/tiff', 'image/webp', 'image/gif',
+    'application/pdf'
+})
+
+# Leading magic bytes of JPEG, PNG, BMP, PDF and GIF files, matched in one pass
+_SIGNATURE_RE = re.compile(rb'\xff\xd8\xff|\x89PNG\r\n\x1a\n|BM|%PDF|GIF8')
+_SIGNATURE_LENGTH = 8
+
+# A '..' component under either path separator
+_TRAVERSAL_RE = re.compile(r'(?:^|[/\\])\.\.(?:[/\\]|$)')
+
+
 class FileValidator:
     """Validates uploaded files"""
     
@@ -59,8 +78,8 @@ class FileValidator:
     
     def _is_valid_size(self, file: FileStorage) -> bool:
         """Check if file size is within limits"""
-        # Get file size
-        file.seek(0, 2)  # Seek to end
+        # Get file size from the stream position; no bytes are read
+        file.seek(0, io.SEEK_END)
         size = file.tell()
         file.seek(0)  # Reset to beginning
         
@@ -68,34 +87,18 @@ class FileValidator:
     
     def _is_valid_mime_type(self, file: FileStorage) -> bool:
         """Check if MIME type is valid for images"""
-        valid_mime_types = {
-            'image/jpeg', 'image/jpg', 'image/png', 'image/bmp',
-            'image/tiff', 'image/webp', 'image/gif',
-            'application/pdf'
-        }
-        
         # Get MIME type from file content
         mime_type, _ = mimetypes.guess_type(file.filename)
         
-        if mime_type in valid_mime_types:
+        if mime_type in _VALID_MIME_TYPES:
             return True
         
-        # Additional check using file content (first few bytes)
+        # Additional check using file content (only the signature bytes are needed)
         file.seek(0)
-        header = file.read(1024)
+        header = file.read(_SIGNATURE_LENGTH)
         file.seek(0)
         
-        # Check for common image headers
-        if header.startswith(b'\xff\xd8\xff'):  # JPEG
-            return True
-        elif header.startswith(b'\x89PNG\r\n\x1a\n'):  # PNG
-            return True
-        elif header.startswith(b'BM'):  # BMP
-            return True
-        elif header.startswith(b'%PDF'):  # PDF
-            return True
-        
-        return False
+        return _SIGNATURE_RE.match(header) is not None
 
 
 class InputValidator:
@@ -122,8 +125,8 @@ class InputValidator:
         if len(prompt) > max_length:
             raise ValidationError(f"Prompt too long. Maximum length: {max_length}")
         
-        # Basic sanitization
-        prompt = prompt.replace('\x00', '')  # Remove null bytes
+        # Basic sanitization: drop null bytes and other control characters in one pass
+        prompt = prompt.translate(_SANITIZE_TABLE)
         
         return prompt
     
@@ -139,16 +142,17 @@ class InputValidator:
         Returns:
             True if valid, raises ValidationError if invalid
         """
-        # Normalize path
-        normalized_path = os.path.normpath(file_path)
-        
-        # Check for path traversal attempts
-        if '..' in normalized_path:
+        # Check for path traversal attempts before normalization can fold them away
+        if _TRAVERSAL_RE.search(file_path):
             raise ValidationError("Path traversal not allowed")
         
+        # Normalize path (pure string operation, no filesystem access)
+        normalized_path = os.path.normpath(file_path)
+        
         # Check if path is within allowed directories
         for allowed_dir in allowed_dirs:
-            if normalized_path.startswith(os.path.normpath(allowed_dir)):
+            allowed = os.path.normpath(allowed_dir)
+            if normalized_path == allowed or normalized_path.startswith(allowed + os.sep):
                 return True
         
         raise ValidationError("File path not in allowed directories")
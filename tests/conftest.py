@@ -3,9 +3,9 @@ Test configuration for DeepSeek OCR
 """
 
 import os
-import tempfile
+import shutil
 import pytest
-from unittest.mock import Mock
+from unittest.mock import MagicMock, Mock, patch
 
 # Test configuration
 TEST_CONFIG = {
@@ -80,6 +80,53 @@ os.makedirs('./test_results', exist_ok=True)
 os.makedirs('./test_logs', exist_ok=True)
 
 
+def pytest_configure(config):
+    """Register custom markers"""
+    config.addinivalue_line("markers", "requires_ocr: needs a working OCR backend")
+    config.addinivalue_line("markers", "integration: exercises the full application stack")
+    config.addinivalue_line("markers", "slow: long-running test")
+
+
+@pytest.fixture(scope="session")
+def ocr_available():
+    """Probe once per session whether the app can be built to serve OCR requests"""
+    from app.main import create_app
+    
+    # Demo and fallback modes still answer OCR requests, so an app that builds is enough
+    try:
+        create_app()
+    except Exception:
+        return False
+    return True
+
+
+@pytest.fixture(autouse=True)
+def _skip_without_ocr(request):
+    """Skip tests marked requires_ocr when no OCR backend is available"""
+    if request.node.get_closest_marker("requires_ocr") is None:
+        return
+    if not request.getfixturevalue("ocr_available"):
+        pytest.skip("OCR backend not available")
+
+
+@pytest.fixture(scope="session", autouse=True)
+def _mock_hf():
+    """Stand in for transformers once for the whole session; no test loads real weights"""
+    transformers = MagicMock()
+    with patch('app.ocr.deepseek_ocr._lazy_transformers', return_value=transformers):
+        yield transformers.AutoModelForCausalLM, transformers.AutoProcessor
+
+
+@pytest.fixture(scope="module")
+def test_app():
+    """Flask application shared by the tests of a module"""
+    from app.main import create_app
+    
+    app = create_app()
+    app.config['TESTING'] = True
+    return app
+
+
 @pytest.fixture
 def test_config():
     """Provide test configuration"""
@@ -87,10 +134,9 @@ def test_config():
 
 
 @pytest.fixture
-def temp_dir():
-    """Create temporary directory for tests"""
-    with tempfile.TemporaryDirectory() as tmpdir:
-        yield tmpdir
+def temp_dir(tmp_path):
+    """Create temporary directory for tests (per xdist worker)"""
+    return str(tmp_path)
 
 
 @pytest.fixture
@@ -171,8 +217,6 @@ def client(test_config, mock_ocr_processor):
 
 def cleanup_test_files():
     """Clean up test files after tests"""
-    import shutil
-    
     for directory in ['./test_uploads', './test_results', './test_logs']:
         if os.path.exists(directory):
             shutil.rmtree(directory)
@@ -5,12 +5,53 @@ Integration tests for the Flask web application
 import os
 import json
 import tempfile
-from io import BytesIO
-from PIL import Image
+import pytest
+from io import BytesIO, RawIOBase
 
 from app.main import create_app
 
 
+class RepeatReader(RawIOBase):
+    """Readable stream of ``size`` copies of one byte, produced chunk by chunk"""
+    
+    def __init__(self, size, fill=b'x'):
+        self._remaining = size
+        self._fill = fill
+    
+    def readable(self):
+        return True
+    
+    def readinto(self, buffer):
+        n = min(len(buffer), self._remaining)
+        buffer[:n] = self._fill * n
+        self._remaining -= n
+        return n
+
+
+def _contains(response, needle):
+    """Search a response body chunk by chunk without joining it"""
+    keep = len(needle) - 1
+    tail = b''
+    for chunk in response.iter_encoded():
+        # Carry the end of the previous chunk so a needle split across chunks still matches
+        buf = tail + chunk
+        if needle in buf:
+            return True
+        tail = buf[max(len(buf) - keep, 0):] if keep else b''
+    return False
+
+
+@pytest.fixture(scope="module")
+def jpeg_bytes():
+    """Encoded JPEG payload shared by upload tests"""
+    from PIL import Image
+    
+    image = Image.new('RGB', (100, 100), (255, 255, 255))
+    img_io = BytesIO()
+    image.save(img_io, format='JPEG')
+    return img_io.getvalue()
+
+
 class TestFlaskApp:
     """Test Flask application endpoints"""
     
@@ -22,6 +63,8 @@ class TestFlaskApp:
     
     def create_test_image_file(self, size=(100, 100), format='JPEG'):
         """Create a test image file in memory"""
+        from PIL import Image
+        
         image = Image.new('RGB', size, (255, 255, 255))
         img_io = BytesIO()
         image.save(img_io, format=format)
@@ -32,7 +75,18 @@ class TestFlaskApp:
         """Test main index page"""
         response = self.client.get('/')
         assert response.status_code == 200
-        assert b'DeepSeek OCR' in response.data
+        assert _contains(response, b'DeepSeek OCR')
+    
+    def test_contains_spans_streamed_chunks(self):
+        """Test the body search finds a needle split across streamed chunks"""
+        from flask import Response
+        
+        def body():
+            yield b'<h1>Deep'
+            yield b'Seek OCR</h1>'
+        
+        assert _contains(Response(body()), b'DeepSeek OCR')
+        assert not _contains(Response(body()), b'DeepSeek OCR!')
     
     def test_health_endpoint(self):
         """Test health check endpoint"""
@@ -76,6 +130,7 @@ class TestFlaskApp:
         assert 'error' in data
         assert 'No file selected' in data['error']
     
+    @pytest.mark.requires_ocr
     def test_upload_valid_image(self):
         """Test upload endpoint with valid image"""
         img_data = self.create_test_image_file()
@@ -84,17 +139,13 @@ class TestFlaskApp:
             'file': (img_data, 'test.jpg', 'image/jpeg')
         })
         
-        # This might fail in test environment without proper OCR setup
-        # The exact status depends on the OCR processor mock
-        assert response.status_code in [200, 500]  # Either success or server error
+        assert response.status_code == 200
         
         data = json.loads(response.data)
-        if response.status_code == 200:
-            assert 'success' in data
-            assert 'text' in data
-        else:
-            assert 'error' in data
+        assert 'success' in data
+        assert 'text' in data
     
+    @pytest.mark.requires_ocr
     def test_upload_with_prompt(self):
         """Test upload endpoint with custom prompt"""
         img_data = self.create_test_image_file()
@@ -105,8 +156,7 @@ class TestFlaskApp:
             'prompt': custom_prompt
         })
         
-        # Status depends on OCR processor setup
-        assert response.status_code in [200, 500]
+        assert response.status_code == 200
     
     def test_upload_invalid_file_type(self):
         """Test upload endpoint with invalid file type"""
@@ -129,28 +179,23 @@ class TestFlaskApp:
         assert 'error' in data
         assert 'No files provided' in data['error']
     
-    def test_batch_upload_valid_files(self):
+    @pytest.mark.requires_ocr
+    @pytest.mark.xfail(strict=True, reason="batch routes cap uploads at performance.batch_size, which defaults to 1")
+    def test_batch_upload_valid_files(self, jpeg_bytes):
         """Test batch upload endpoint with valid files"""
-        img1 = self.create_test_image_file()
-        img2 = self.create_test_image_file()
-        
         response = self.client.post('/batch_upload', data={
             'files': [
-                (img1, 'test1.jpg', 'image/jpeg'),
-                (img2, 'test2.jpg', 'image/jpeg')
+                (BytesIO(jpeg_bytes), 'test1.jpg', 'image/jpeg'),
+                (BytesIO(jpeg_bytes), 'test2.jpg', 'image/jpeg')
             ]
         })
         
-        # Status depends on OCR processor setup
-        assert response.status_code in [200, 500]
+        assert response.status_code == 200
         
         data = json.loads(response.data)
-        if response.status_code == 200:
-            assert 'success' in data
-            assert 'total_files' in data
-            assert 'results' in data
-        else:
-            assert 'error' in data
+        assert 'success' in data
+        assert 'total_files' in data
+        assert 'results' in data
     
     def test_result_endpoint_not_found(self):
         """Test result endpoint with non-existent result ID"""
@@ -191,6 +236,7 @@ class TestFlaskApp:
         assert 'error' in data
         assert 'No file provided' in data['error']
     
+    @pytest.mark.requires_ocr
     def test_api_ocr_valid_file(self):
         """Test API OCR endpoint with valid file"""
         img_data = self.create_test_image_file()
@@ -200,17 +246,13 @@ class TestFlaskApp:
             'include_metadata': 'true'
         })
         
-        # Status depends on OCR processor setup
-        assert response.status_code in [200, 500]
+        assert response.status_code == 200
         
         data = json.loads(response.data)
-        if response.status_code == 200:
-            assert 'success' in data
-            assert 'text' in data
-            assert 'confidence' in data
-            assert 'metadata' in data
-        else:
-            assert 'error' in data
+        assert 'success' in data
+        assert 'text' in data
+        assert 'confidence' in data
+        assert 'metadata' in data
     
     def test_api_batch_ocr_no_files(self):
         """Test API batch OCR endpoint with no files"""
@@ -221,29 +263,24 @@ class TestFlaskApp:
         assert 'error' in data
         assert 'No files provided' in data['error']
     
-    def test_api_batch_ocr_valid_files(self):
+    @pytest.mark.requires_ocr
+    @pytest.mark.xfail(strict=True, reason="batch routes cap uploads at performance.batch_size, which defaults to 1")
+    def test_api_batch_ocr_valid_files(self, jpeg_bytes):
         """Test API batch OCR endpoint with valid files"""
-        img1 = self.create_test_image_file()
-        img2 = self.create_test_image_file()
-        
         response = self.client.post('/api/v1/ocr/batch', data={
             'files': [
-                (img1, 'test1.jpg', 'image/jpeg'),
-                (img2, 'test2.jpg', 'image/jpeg')
+                (BytesIO(jpeg_bytes), 'test1.jpg', 'image/jpeg'),
+                (BytesIO(jpeg_bytes), 'test2.jpg', 'image/jpeg')
             ],
             'include_metadata': 'true'
         })
         
-        # Status depends on OCR processor setup
-        assert response.status_code in [200, 500]
+        assert response.status_code == 200
         
         data = json.loads(response.data)
-        if response.status_code == 200:
-            assert 'success' in data
-            assert 'total_files' in data
-            assert 'results' in data
-        else:
-            assert 'error' in data
+        assert 'success' in data
+        assert 'total_files' in data
+        assert 'results' in data
     
     def test_api_structured_ocr_no_file(self):
         """Test API structured OCR endpoint with no file"""
@@ -267,6 +304,7 @@ class TestFlaskApp:
         assert 'error' in data
         assert 'structure_prompt is required' in data['error']
     
+    @pytest.mark.requires_ocr
     def test_api_structured_ocr_valid_request(self):
         """Test API structured OCR endpoint with valid request"""
         img_data = self.create_test_image_file()
@@ -277,17 +315,13 @@ class TestFlaskApp:
             'structure_prompt': structure_prompt
         })
         
-        # Status depends on OCR processor setup
-        assert response.status_code in [200, 500]
+        assert response.status_code == 200
         
         data = json.loads(response.data)
-        if response.status_code == 200:
-            assert 'success' in data
-            assert 'text' in data
-            assert 'is_structured' in data
-            assert 'metadata' in data
-        else:
-            assert 'error' in data
+        assert 'success' in data
+        assert 'text' in data
+        assert 'is_structured' in data
+        assert 'metadata' in data
     
     def test_cors_headers(self):
         """Test CORS headers are present"""
@@ -299,8 +333,8 @@ class TestFlaskApp:
     
     def test_file_size_limit(self):
         """Test file size limit enforcement"""
-        # Create a large file that exceeds the limit
-        large_data = BytesIO(b'x' * (60 * 1024 * 1024))  # 60MB
+        # Stream a file that exceeds the limit without building it in memory
+        large_data = RepeatReader(60 * 1024 * 1024)  # 60MB
         
         response = self.client.post('/upload', data={
             'file': (large_data, 'large.jpg', 'image/jpeg')
@@ -309,6 +343,17 @@ class TestFlaskApp:
         # Should return 413 (Request Entity Too Large) or 400
         assert response.status_code in [400, 413]
     
+    def test_oversized_request_rejected_before_reading(self):
+        """Test that a declared Content-Length over the limit is refused up front"""
+        limit = self.app.config['MAX_CONTENT_LENGTH']
+        
+        response = self.client.post('/upload', data=b'',
+                                    environ_overrides={'CONTENT_LENGTH': str(limit + 1)})
+        
+        assert response.status_code == 413
+        data = json.loads(response.data)
+        assert data['error'] == 'File too large'
+    
     def test_content_type_validation(self):
         """Test content type validation"""
         # Test with wrong content type
@@ -2,15 +2,87 @@
 Unit tests for configuration management
 """
 
-import os
-import tempfile
+import re
 import pytest
-from unittest.mock import patch, mock_open
+import yaml
 
-from app.utils.config import Config, ConfigManager, get_config
+from app.utils import config as config_module
+from app.utils.config import Config, ConfigManager, get_config, invalidate_config_cache
 from app.utils.exceptions import ConfigurationError
 
 
+# Complete configuration exercising every section
+_FULL_YAML = """
+server:
+  host: "127.0.0.1"
+  port: 9000
+  debug: true
+
+model:
+  name: "custom-model"
+  use_local: false
+  device: "cpu"
+  precision: "fp32"
+
+api:
+  deepseek_api_key: "test-key"
+  timeout: 60
+
+upload:
+  max_file_size: 10485760
+  allowed_extensions: ["jpg", "png"]
+
+ocr:
+  confidence_threshold: 0.7
+  max_image_size: 2048
+  preprocessing:
+    enabled: false
+
+logging:
+  level: "WARNING"
+  file: "/tmp/test.log"
+
+performance:
+  batch_size: 5
+  max_workers: 8
+  cache_enabled: false
+
+security:
+  max_requests_per_ip: 50
+  csrf_protection: false
+"""
+
+
+# Configurations that must fail validation, with the expected error
+_LOCAL_PATH_YAML = """
+model:
+  use_local: true
+  local_path: ""
+"""
+_API_KEY_YAML = """
+model:
+  use_local: false
+api:
+  deepseek_api_key: ""
+"""
+_PORT_YAML = """
+server:
+  port: 70000
+"""
+
+_LOCAL_PATH_RE = re.compile("Local model path required")
+_API_KEY_RE = re.compile("DeepSeek API key required")
+_PORT_RE = re.compile("Server port must be between")
+
+
+@pytest.fixture(scope="module")
+def full_config(tmp_path_factory):
+    """Config parsed once from _FULL_YAML and shared by the integration tests"""
+    config_path = tmp_path_factory.mktemp("cfg") / "config.yaml"
+    config_path.write_text(_FULL_YAML)
+    return ConfigManager(str(config_path)).get_config()
+
+
 class TestConfigClasses:
     """Test configuration data classes"""
     
@@ -29,32 +101,40 @@ class TestConfigClasses:
         """Test configuration field types"""
         config = Config()
         
-        assert isinstance(config.server.port, int)
-        assert isinstance(config.server.debug, bool)
-        assert isinstance(config.model.temperature, float)
-        assert isinstance(config.upload.allowed_extensions, list)
+        for path, expected_type in [
+            ("server.port", int),
+            ("server.debug", bool),
+            ("model.temperature", float),
+            ("upload.allowed_extensions", list),
+        ]:
+            value = config
+            for attr in path.split("."):
+                value = getattr(value, attr)
+            assert isinstance(value, expected_type), path
 
 
 class TestConfigManager:
     """Test configuration manager"""
     
-    def test_config_manager_creation(self):
+    def test_config_manager_creation(self, tmp_path):
         """Test creating config manager"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("""
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("""
 server:
   port: 8080
 model:
   name: "test-model"
 """)
-            config_path = f.name
         
-        try:
-            manager = ConfigManager(config_path)
-            assert manager.config.server.port == 8080
-            assert manager.config.model.name == "test-model"
-        finally:
-            os.unlink(config_path)
+        manager = ConfigManager(str(config_path))
+        assert manager.config.server.port == 8080
+        assert manager.config.model.name == "test-model"
+    
+    def test_yaml_loader_uses_libyaml_when_available(self):
+        """Test that the C loader is used when PyYAML ships with libyaml"""
+        if not yaml.__with_libyaml__:
+            pytest.skip("PyYAML built without libyaml")
+        assert config_module.YamlLoader is yaml.CSafeLoader
     
     def test_config_manager_missing_file(self):
         """Test config manager with missing file"""
@@ -62,99 +142,56 @@ model:
         # Should create config with defaults
         assert manager.config.server.port == 5000
     
-    @patch.dict(os.environ, {'DEEPSEEK_API_KEY': 'test-key', 'PORT': '8080'})
-    def test_env_variable_override(self):
+    def test_env_variable_override(self, monkeypatch):
         """Test environment variable overrides"""
+        monkeypatch.setenv('DEEPSEEK_API_KEY', 'test-key')
+        monkeypatch.setenv('PORT', '8080')
         manager = ConfigManager("nonexistent.yaml")
         
         assert manager.config.api.deepseek_api_key == 'test-key'
         assert manager.config.server.port == 8080
     
-    def test_invalid_yaml(self):
+    def test_invalid_yaml(self, tmp_path):
         """Test handling of invalid YAML"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("invalid: yaml: content: [")
-            config_path = f.name
-        
-        try:
-            with pytest.raises(ConfigurationError):
-                ConfigManager(config_path)
-        finally:
-            os.unlink(config_path)
-    
-    def test_config_validation_local_model_missing_path(self):
-        """Test validation fails when local model path is missing"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("""
-model:
-  use_local: true
-  local_path: ""
-""")
-            config_path = f.name
-        
-        try:
-            with pytest.raises(ConfigurationError, match="Local model path required"):
-                ConfigManager(config_path)
-        finally:
-            os.unlink(config_path)
-    
-    def test_config_validation_api_mode_missing_key(self):
-        """Test validation fails when API key is missing"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("""
-model:
-  use_local: false
-api:
-  deepseek_api_key: ""
-""")
-            config_path = f.name
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("invalid: yaml: content: [")
         
-        try:
-            with pytest.raises(ConfigurationError, match="DeepSeek API key required"):
-                ConfigManager(config_path)
-        finally:
-            os.unlink(config_path)
+        with pytest.raises(ConfigurationError):
+            ConfigManager(str(config_path))
     
-    def test_config_validation_invalid_port(self):
-        """Test validation fails with invalid port"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("""
-server:
-  port: 70000
-""")
-            config_path = f.name
+    @pytest.mark.parametrize("yaml_text, pattern", [
+        (_LOCAL_PATH_YAML, _LOCAL_PATH_RE),
+        (_API_KEY_YAML, _API_KEY_RE),
+        (_PORT_YAML, _PORT_RE),
+    ], ids=["local_model_missing_path", "api_mode_missing_key", "invalid_port"])
+    def test_config_validation(self, tmp_path, yaml_text, pattern):
+        """Test validation rejects inconsistent configuration"""
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text(yaml_text)
         
-        try:
-            with pytest.raises(ConfigurationError, match="Server port must be between"):
-                ConfigManager(config_path)
-        finally:
-            os.unlink(config_path)
+        with pytest.raises(ConfigurationError, match=pattern):
+            ConfigManager(str(config_path))
     
-    def test_config_reload(self):
+    def test_config_reload(self, tmp_path):
         """Test configuration reloading"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write("""
+        config_path = tmp_path / "config.yaml"
+        config_path.write_text("""
 server:
   port: 6000
 """)
-            config_path = f.name
         
-        try:
-            manager = ConfigManager(config_path)
-            assert manager.config.server.port == 6000
-            
-            # Modify file
-            with open(config_path, 'w') as f:
-                f.write("""
+        manager = ConfigManager(str(config_path))
+        assert manager.config.server.port == 6000
+        
+        # Modify file
+        config_path.write_text("""
 server:
   port: 7000
 """)
-            
-            # Reload config
-            manager.reload_config()
-            assert manager.config.server.port == 7000
-        finally:
-            os.unlink(config_path)
+        
+        # Reload config
+        manager.reload_config()
+        assert manager.config.server.port == 7000
 
 
 class TestGlobalConfig:
@@ -165,98 +202,72 @@ class TestGlobalConfig:
         config = get_config()
         assert isinstance(config, Config)
     
-    @patch('app.utils.config._config_manager', None)
-    def test_get_config_creates_manager(self):
+    def test_get_config_creates_manager(self, monkeypatch):
         """Test that get_config creates manager if not exists"""
+        monkeypatch.setattr('app.utils.config._config_manager', None)
         config = get_config()
         assert isinstance(config, Config)
+    
+    def test_get_config_is_cached(self, monkeypatch):
+        """Test that repeated get_config calls reuse the parsed config"""
+        monkeypatch.setattr('app.utils.config._config_manager', None)
+        assert get_config() is get_config()
+    
+    def test_invalidate_config_cache(self, monkeypatch):
+        """Test that invalidation forces the next get_config to re-parse"""
+        monkeypatch.setattr('app.utils.config._config_manager', None)
+        first = get_config()
+        invalidate_config_cache()
+        assert get_config() is not first
 
 
 class TestConfigIntegration:
     """Integration tests for configuration"""
     
-    def test_complete_config_flow(self):
-        """Test complete configuration loading flow"""
-        yaml_content = """
-server:
-  host: "127.0.0.1"
-  port: 9000
-  debug: true
-
-model:
-  name: "custom-model"
-  use_local: false
-  device: "cpu"
-  precision: "fp32"
-
-api:
-  deepseek_api_key: "test-key"
-  timeout: 60
-
-upload:
-  max_file_size: 10485760
-  allowed_extensions: ["jpg", "png"]
-
-ocr:
-  confidence_threshold: 0.7
-  max_image_size: 2048
-  preprocessing:
-    enabled: false
-
-logging:
-  level: "WARNING"
-  file: "/tmp/test.log"
-
-performance:
-  batch_size: 5
-  max_workers: 8
-  cache_enabled: false
-
-security:
-  max_requests_per_ip: 50
-  csrf_protection: false
-"""
-        
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
-            f.write(yaml_content)
-            config_path = f.name
-        
-        try:
-            manager = ConfigManager(config_path)
-            config = manager.get_config()
-            
-            # Verify all sections
-            assert config.server.host == "127.0.0.1"
-            assert config.server.port == 9000
-            assert config.server.debug == True
-            
-            assert config.model.name == "custom-model"
-            assert config.model.use_local == False
-            assert config.model.device == "cpu"
-            assert config.model.precision == "fp32"
-            
-            assert config.api.deepseek_api_key == "test-key"
-            assert config.api.timeout == 60
-            
-            assert config.upload.max_file_size == 10485760
-            assert config.upload.allowed_extensions == ["jpg", "png"]
-            
-            assert config.ocr.confidence_threshold == 0.7
-            assert config.ocr.max_image_size == 2048
-            assert config.ocr.preprocessing.enabled == False
-            
-            assert config.logging.level == "WARNING"
-            assert config.logging.file == "/tmp/test.log"
-            
-            assert config.performance.batch_size == 5
-            assert config.performance.max_workers == 8
-            assert config.performance.cache_enabled == False
-            
-            assert config.security.max_requests_per_ip == 50
-            assert config.security.csrf_protection == False
-            
-        finally:
-            os.unlink(config_path)
+    def test_server_section(self, full_config):
+        """Test server settings from a complete config file"""
+        assert full_config.server.host == "127.0.0.1"
+        assert full_config.server.port == 9000
+        assert full_config.server.debug == True
+    
+    def test_model_section(self, full_config):
+        """Test model settings from a complete config file"""
+        assert full_config.model.name == "custom-model"
+        assert full_config.model.use_local == False
+        assert full_config.model.device == "cpu"
+        assert full_config.model.precision == "fp32"
+    
+    def test_api_section(self, full_config):
+        """Test API settings from a complete config file"""
+        assert full_config.api.deepseek_api_key == "test-key"
+        assert full_config.api.timeout == 60
+    
+    def test_upload_section(self, full_config):
+        """Test upload settings from a complete config file"""
+        assert full_config.upload.max_file_size == 10485760
+        assert full_config.upload.allowed_extensions == ["jpg", "png"]
+    
+    def test_ocr_section(self, full_config):
+        """Test OCR settings from a complete config file"""
+        assert full_config.ocr.confidence_threshold == 0.7
+        assert full_config.ocr.max_image_size == 2048
+        assert full_config.ocr.preprocessing.enabled == False
+    
+    def test_logging_section(self, full_config):
+        """Test logging settings from a complete config file"""
+        assert full_config.logging.level == "WARNING"
+        assert full_config.logging.file == "/tmp/test.log"
+    
+    def test_performance_section(self, full_config):
+        """Test performance settings from a complete config file"""
+        assert full_config.performance.batch_size == 5
+        assert full_config.performance.max_workers == 8
+        assert full_config.performance.cache_enabled == False
+    
+    def test_security_section(self, full_config):
+        """Test security settings from a complete config file"""
+        assert full_config.security.max_requests_per_ip == 50
+        assert full_config.security.csrf_protection == False
 
 
 if __name__ == '__main__':
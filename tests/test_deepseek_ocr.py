@@ -3,7 +3,9 @@ Unit tests for DeepSeek OCR core functionality
 """
 
 import os
-import tempfile
+import copy
+import pytest
+from io import BytesIO
 from unittest.mock import Mock, patch, MagicMock
 from PIL import Image
 
@@ -12,68 +14,92 @@ from app.utils.config import Config
 from app.utils.exceptions import OCRError, ModelError
 
 
+@pytest.fixture(scope="module")
+def api_config():
+    """API-mode configuration shared by the module"""
+    config = Config()
+    config.model.use_local = False  # Use API mode for easier testing
+    config.api.deepseek_api_key = "test-api-key"
+    return config
+
+
+@pytest.fixture(scope="module")
+def local_mode_config():
+    """Local-mode configuration shared by the module"""
+    config = Config()
+    config.model.use_local = True
+    config.model.local_path = "./test_models/deepseek"
+    return config
+
+
+@pytest.fixture
+def config(api_config):
+    """Private copy of the API-mode config that a test may mutate"""
+    return copy.deepcopy(api_config)
+
+
+@pytest.fixture
+def local_config(local_mode_config):
+    """Private copy of the local-mode config that a test may mutate"""
+    return copy.deepcopy(local_mode_config)
+
+
 class TestDeepSeekOCR:
     """Test DeepSeek OCR functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.config = Config()
-        self.config.model.use_local = False  # Use API mode for easier testing
-        self.config.api.deepseek_api_key = "test-api-key"
-    
-    @patch('app.ocr.deepseek_ocr.torch')
-    def test_get_device_auto_cuda_available(self, mock_torch):
+    @patch('app.ocr.deepseek_ocr._lazy_torch')
+    def test_get_device_auto_cuda_available(self, mock_torch, config):
         """Test device selection when CUDA is available"""
-        mock_torch.cuda.is_available.return_value = True
-        self.config.model.device = "auto"
+        mock_torch.return_value.cuda.is_available.return_value = True
+        config.model.device = "auto"
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         assert ocr.device == "cuda"
     
-    @patch('app.ocr.deepseek_ocr.torch')
-    def test_get_device_auto_cuda_unavailable(self, mock_torch):
+    @patch('app.ocr.deepseek_ocr._lazy_torch')
+    def test_get_device_auto_cuda_unavailable(self, mock_torch, config):
         """Test device selection when CUDA is unavailable"""
-        mock_torch.cuda.is_available.return_value = False
-        self.config.model.device = "auto"
+        mock_torch.return_value.cuda.is_available.return_value = False
+        config.model.device = "auto"
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         assert ocr.device == "cpu"
     
-    def test_get_device_explicit(self):
+    def test_get_device_explicit(self, config):
         """Test explicit device selection"""
-        self.config.model.device = "cpu"
-        ocr = DeepSeekOCR(self.config)
+        config.model.device = "cpu"
+        ocr = DeepSeekOCR(config)
         assert ocr.device == "cpu"
     
-    def test_initialization_api_mode(self):
+    def test_initialization_api_mode(self, config):
         """Test OCR initialization in API mode"""
-        self.config.model.use_local = False
-        self.config.api.deepseek_api_key = "test-key"
+        config.model.use_local = False
+        config.api.deepseek_api_key = "test-key"
         
-        ocr = DeepSeekOCR(self.config)
-        assert ocr.config == self.config
+        ocr = DeepSeekOCR(config)
+        assert ocr.config == config
         assert ocr.model is None  # No local model in API mode
         assert ocr.tokenizer is None
     
     @patch('app.ocr.deepseek_ocr.os.path.exists')
-    def test_initialization_local_mode_model_not_found(self, mock_exists):
+    def test_initialization_local_mode_model_not_found(self, mock_exists, config):
         """Test OCR initialization when local model is not found"""
         mock_exists.return_value = False
-        self.config.model.use_local = True
-        self.config.model.local_path = "./nonexistent/model"
+        config.model.use_local = True
+        config.model.local_path = "./nonexistent/model"
         
         with pytest.raises(ModelError, match="Model path not found"):
-            DeepSeekOCR(self.config)
+            DeepSeekOCR(config)
     
     def create_test_image(self, size=(100, 100)):
-        """Create a test image file"""
-        image = Image.new('RGB', size, (255, 255, 255))
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as f:
-            image.save(f.name, format='JPEG')
-            return f.name
+        """Create an encoded test image in memory"""
+        buf = BytesIO()
+        Image.new('RGB', size, (255, 255, 255)).save(buf, format='JPEG')
+        buf.seek(0)
+        return buf
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_extract_text_api_success(self, mock_post):
+    def test_extract_text_api_success(self, mock_post, config):
         """Test successful text extraction using API"""
         # Mock API response
         mock_response = Mock()
@@ -93,23 +119,20 @@ class TestDeepSeekOCR:
         }
         mock_post.return_value = mock_response
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         
-        try:
-            result = ocr.extract_text(image_path)
-            
-            assert result['text'] == "Extracted text from image"
-            assert result['confidence'] == 1.0
-            assert result['method'] == "deepseek_api"
-            assert 'usage' in result
-            assert result['image_path'] == image_path
-            assert result['model_used'] == self.config.model.name
-        finally:
-            os.unlink(image_path)
+        result = ocr.extract_text(image_path)
+        
+        assert result['text'] == "Extracted text from image"
+        assert result['confidence'] == 1.0
+        assert result['method'] == "deepseek_api"
+        assert 'usage' in result
+        assert result['image_path'] == image_path
+        assert result['model_used'] == config.model.name
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_extract_text_api_failure(self, mock_post):
+    def test_extract_text_api_failure(self, mock_post, config):
         """Test API failure during text extraction"""
         # Mock API error response
         mock_response = Mock()
@@ -117,17 +140,14 @@ class TestDeepSeekOCR:
         mock_response.text = "Bad Request"
         mock_post.return_value = mock_response
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         
-        try:
-            with pytest.raises(OCRError, match="API request failed"):
-                ocr.extract_text(image_path)
-        finally:
-            os.unlink(image_path)
+        with pytest.raises(OCRError, match="API request failed"):
+            ocr.extract_text(image_path)
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_extract_text_with_custom_prompt(self, mock_post):
+    def test_extract_text_with_custom_prompt(self, mock_post, config):
         """Test text extraction with custom prompt"""
         # Mock API response
         mock_response = Mock()
@@ -138,26 +158,23 @@ class TestDeepSeekOCR:
         }
         mock_post.return_value = mock_response
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         custom_prompt = "Extract only numbers from this image"
         
-        try:
-            result = ocr.extract_text(image_path, custom_prompt)
-            
-            # Verify the prompt was used in the API call
-            mock_post.assert_called_once()
-            call_args = mock_post.call_args
-            request_data = call_args[1]['json']
-            
-            assert custom_prompt in str(request_data['messages'])
-            assert result['text'] == "Custom prompt result"
-        finally:
-            os.unlink(image_path)
+        result = ocr.extract_text(image_path, custom_prompt)
+        
+        # Verify the prompt was used in the API call
+        mock_post.assert_called_once()
+        call_args = mock_post.call_args
+        request_data = call_args[1]['json']
+        
+        assert custom_prompt in str(request_data['messages'])
+        assert result['text'] == "Custom prompt result"
     
-    def test_image_to_base64(self):
+    def test_image_to_base64(self, config):
         """Test image to base64 conversion"""
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image = Image.new('RGB', (50, 50), (255, 0, 0))
         
         base64_str = ocr._image_to_base64(image)
@@ -167,13 +184,143 @@ class TestDeepSeekOCR:
         # Base64 strings should be valid (no spaces, proper characters)
         import base64
         try:
-            base64.b64decode(base64_str)
-            assert True
+            decoded = base64.b64decode(base64_str)
         except Exception:
             assert False, "Invalid base64 string generated"
+        
+        # Decoded payload should be a JPEG (SOI marker)
+        assert decoded[:2] == b'\xff\xd8'
+    
+    def test_image_to_base64_downscales_large_image(self, config):
+        """Test oversized images are resized before being encoded"""
+        import base64
+        import io
+        
+        config.ocr.max_image_size = 512
+        ocr = DeepSeekOCR(config)
+        image = Image.new('RGB', (2000, 1000), (255, 255, 255))
+        
+        decoded = Image.open(io.BytesIO(base64.b64decode(ocr._image_to_base64(image))))
+        
+        assert decoded.format == 'JPEG'
+        assert decoded.size == (512, 256)
+    
+    def test_image_to_base64_cache_hit(self, config):
+        """Test repeat submissions of one source are encoded once and served from the cache"""
+        ocr = DeepSeekOCR(config)
+        mock_simplejpeg = Mock()
+        mock_simplejpeg.encode_jpeg.return_value = b'\xff\xd8\xff\xd9'
+        
+        with patch('app.ocr.deepseek_ocr.simplejpeg', mock_simplejpeg):
+            result1 = ocr._image_to_base64(Image.new('RGB', (50, 50), (255, 0, 0)), 'digest')
+            result2 = ocr._image_to_base64(Image.new('RGB', (50, 50), (255, 0, 0)), 'digest')
+            ocr._image_to_base64(Image.new('RGB', (50, 50), (255, 0, 0)))
+        
+        assert id(result1) == id(result2)
+        assert mock_simplejpeg.encode_jpeg.call_count == 2  # Keyless calls are never cached
+    
+    def test_image_to_base64_cache_bounded_by_bytes(self, config):
+        """Test the cache evicts the oldest entries once its encoded size exceeds the limit"""
+        ocr = DeepSeekOCR(config)
+        image = Image.new('RGB', (50, 50), (255, 0, 0))
+        entry_size = len(ocr._image_to_base64(image))
+        
+        with patch('app.ocr.deepseek_ocr.BASE64_CACHE_MAX_BYTES', entry_size * 2):
+            for key in ('a', 'b', 'c'):
+                ocr._image_to_base64(image, key)
+        
+        assert list(ocr._base64_cache) == ['b', 'c']
+        assert ocr._base64_cache_bytes == entry_size * 2
+    
+    def test_extract_text_local_caches_on_source_digest(self, config, tmp_path):
+        """Test the local path keys the encode cache on the uploaded file's bytes"""
+        import app.ocr.deepseek_ocr as deepseek_module
+        
+        config.performance.cache_enabled = True
+        ocr = DeepSeekOCR(config)
+        config.model.use_local = True
+        ocr.model, ocr.tokenizer = Mock(), Mock()
+        
+        png_path = tmp_path / "image.png"
+        Image.new('RGB', (100, 100), (255, 255, 255)).save(png_path, format='PNG')
+        
+        with patch.object(ocr, '_extract_text_local', return_value={"text": "ok"}) as mock_local:
+            ocr.extract_text(str(png_path))
+        
+        assert mock_local.call_args[0][3] == deepseek_module._content_hash(png_path.read_bytes())
+    
+    def test_api_mode_does_not_import_model_stack(self, config):
+        """Test API mode construction leaves torch and transformers unloaded"""
+        config.model.device = "cpu"
+        
+        with patch('app.ocr.deepseek_ocr._lazy_torch') as mock_torch, \
+             patch('app.ocr.deepseek_ocr._lazy_transformers') as mock_transformers:
+            DeepSeekOCR(config)
+        
+        mock_torch.assert_not_called()
+        mock_transformers.assert_not_called()
+    
+    def test_jpeg_passthrough(self, config, tmp_path):
+        """Test conformant JPEG bytes are sent as-is without re-encoding"""
+        import base64
+        
+        ocr = DeepSeekOCR(config)
+        
+        jpeg_path = tmp_path / "image.jpg"
+        Image.new('RGB', (100, 100), (255, 255, 255)).save(jpeg_path, format='JPEG')
+        png_path = tmp_path / "image.png"
+        Image.new('RGB', (100, 100), (255, 255, 255)).save(png_path, format='PNG')
+        
+        header, image_b64 = ocr._jpeg_passthrough(jpeg_path.read_bytes())
+        assert header.size == (100, 100)
+        assert image_b64 == base64.b64encode(jpeg_path.read_bytes()).decode('ascii')
+        assert ocr._jpeg_passthrough(png_path.read_bytes()) is None
+    
+    def test_extract_text_local_jpeg_skips_decode(self, config, tmp_path):
+        """Test a model-ready JPEG reaches the local model without being decoded"""
+        config.ocr.preprocessing.enabled = False
+        ocr = DeepSeekOCR(config)
+        config.model.use_local = True
+        ocr.model, ocr.tokenizer = Mock(), Mock()
+        
+        jpeg_path = tmp_path / "image.jpg"
+        Image.new('RGB', (100, 100), (255, 255, 255)).save(jpeg_path, format='JPEG')
+        
+        with patch.object(ocr.image_processor, 'load_image') as mock_load, \
+             patch.object(ocr, '_encode_image') as mock_encode, \
+             patch.object(ocr, '_extract_text_local', return_value={"text": "ok"}) as mock_local:
+            result = ocr.extract_text(str(jpeg_path))
+        
+        mock_load.assert_not_called()
+        mock_encode.assert_not_called()
+        assert mock_local.call_args[0][2] is not None  # Pre-encoded source bytes
+        assert result["image_size"] == (100, 100)
+    
+    def test_image_to_base64_matches_stdlib(self):
+        """Test the base64 codec in use matches the stdlib encoder"""
+        import base64
+        from app.ocr import deepseek_ocr
+        
+        data = os.urandom(1024 * 1024)
+        assert deepseek_ocr.b64.b64encode(data) == base64.b64encode(data)
+    
+    def test_easyocr_reader_reused(self, config):
+        """Test the EasyOCR reader is built once and reused across calls"""
+        mock_easyocr = Mock()
+        mock_easyocr.Reader.return_value.readtext.return_value = []
+        
+        ocr = DeepSeekOCR(config)
+        image = Image.new('RGB', (50, 50), (255, 255, 255))
+        
+        with patch.dict('sys.modules', {'easyocr': mock_easyocr, 'pytesseract': None}):
+            ocr._extract_text_fallback(image)
+            ocr._extract_text_fallback(image)
+        
+        mock_easyocr.Reader.assert_called_once()
+        assert mock_easyocr.Reader.return_value.readtext.call_count == 2
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_batch_extract_text(self, mock_post):
+    def test_batch_extract_text(self, mock_post, config):
         """Test batch text extraction"""
         # Mock API response
         mock_response = Mock()
@@ -184,26 +331,21 @@ class TestDeepSeekOCR:
         }
         mock_post.return_value = mock_response
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         
         # Create multiple test images
         image_paths = [self.create_test_image() for _ in range(3)]
         
-        try:
-            results = ocr.batch_extract_text(image_paths)
-            
-            assert len(results) == 3
-            for result in results:
-                assert result['text'] == "Batch text result"
-                assert result['method'] == "deepseek_api"
-        finally:
-            for path in image_paths:
-                if os.path.exists(path):
-                    os.unlink(path)
+        results = ocr.batch_extract_text(image_paths)
+        
+        assert len(results) == 3
+        for result in results:
+            assert result['text'] == "Batch text result"
+            assert result['method'] == "deepseek_api"
     
-    def test_batch_extract_text_with_errors(self):
+    def test_batch_extract_text_with_errors(self, config):
         """Test batch processing with some errors"""
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         
         # Mix of valid and invalid paths
         image_paths = [
@@ -212,20 +354,58 @@ class TestDeepSeekOCR:
             self.create_test_image()
         ]
         
-        try:
+        results = ocr.batch_extract_text(image_paths)
+        
+        assert len(results) == 3
+        assert 'error' in results[1]  # Middle one should have error
+        assert results[1]['success'] == False
+    
+    def test_batch_extract_text_runs_concurrently(self, config):
+        """Test batch extraction overlaps work and keeps input order"""
+        import threading
+        import time
+        
+        config.performance.max_workers = 4
+        ocr = DeepSeekOCR(config)
+        
+        lock = threading.Lock()
+        state = {'active': 0, 'peak': 0}
+        
+        def fake_extract(image_path, prompt=None):
+            with lock:
+                state['active'] += 1
+                state['peak'] = max(state['peak'], state['active'])
+            time.sleep(0.05)
+            with lock:
+                state['active'] -= 1
+            return {'image_path': image_path, 'text': image_path}
+        
+        image_paths = [f"image_{i}.jpg" for i in range(16)]
+        
+        with patch.object(ocr, 'extract_text', side_effect=fake_extract):
             results = ocr.batch_extract_text(image_paths)
-            
-            assert len(results) == 3
-            assert 'error' in results[1]  # Middle one should have error
-            assert results[1]['success'] == False
-        finally:
-            for path in image_paths:
-                if os.path.exists(path):
-                    os.unlink(path)
+        
+        assert [r['image_path'] for r in results] == image_paths
+        assert 1 < state['peak'] <= 4
+    
+    def test_batch_extract_text_local_mode_sequential(self, config):
+        """Test local-mode batches run one image at a time on the shared model"""
+        config.performance.max_workers = 4
+        ocr = DeepSeekOCR(config)
+        config.model.use_local = True
+        
+        image_paths = [f"image_{i}.jpg" for i in range(4)]
+        
+        with patch('app.ocr.deepseek_ocr.ThreadPoolExecutor') as mock_pool, \
+             patch.object(ocr, 'extract_text', side_effect=lambda path, prompt=None: {'image_path': path}):
+            results = ocr.batch_extract_text(image_paths)
+        
+        mock_pool.assert_not_called()
+        assert [r['image_path'] for r in results] == image_paths
     
     @patch('app.ocr.deepseek_ocr.requests.post')
     @patch('app.ocr.deepseek_ocr.json.loads')
-    def test_extract_structured_data_success(self, mock_json_loads, mock_post):
+    def test_extract_structured_data_success(self, mock_json_loads, mock_post, config):
         """Test structured data extraction"""
         # Mock API response with JSON
         structured_response = '{"name": "John Doe", "age": 30}'
@@ -240,22 +420,19 @@ class TestDeepSeekOCR:
         # Mock JSON parsing
         mock_json_loads.return_value = {"name": "John Doe", "age": 30}
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         structure_prompt = "Extract personal information as JSON"
         
-        try:
-            result = ocr.extract_structured_data(image_path, structure_prompt)
-            
-            assert result['text'] == structured_response
-            assert result['is_structured'] == True
-            assert 'structured_data' in result
-            assert result['structured_data']['name'] == "John Doe"
-        finally:
-            os.unlink(image_path)
+        result = ocr.extract_structured_data(image_path, structure_prompt)
+        
+        assert result['text'] == structured_response
+        assert result['is_structured'] == True
+        assert 'structured_data' in result
+        assert result['structured_data']['name'] == "John Doe"
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_extract_structured_data_not_json(self, mock_post):
+    def test_extract_structured_data_not_json(self, mock_post, config):
         """Test structured data extraction with non-JSON response"""
         # Mock API response with plain text
         text_response = "This is just plain text"
@@ -267,61 +444,52 @@ class TestDeepSeekOCR:
         }
         mock_post.return_value = mock_response
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         structure_prompt = "Extract information"
         
-        try:
-            result = ocr.extract_structured_data(image_path, structure_prompt)
-            
-            assert result['text'] == text_response
-            assert result['is_structured'] == False
-            assert 'structured_data' not in result
-        finally:
-            os.unlink(image_path)
+        result = ocr.extract_structured_data(image_path, structure_prompt)
+        
+        assert result['text'] == text_response
+        assert result['is_structured'] == False
+        assert 'structured_data' not in result
     
-    def test_extract_text_nonexistent_image(self):
+    def test_extract_text_nonexistent_image(self, config):
         """Test text extraction with non-existent image"""
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         
         with pytest.raises(OCRError):
             ocr.extract_text("nonexistent_image.jpg")
     
-    def test_api_mode_without_key(self):
+    def test_api_mode_without_key(self, config):
         """Test API mode without API key"""
-        self.config.model.use_local = False
-        self.config.api.deepseek_api_key = ""
+        config.model.use_local = False
+        config.api.deepseek_api_key = ""
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         
-        try:
-            with pytest.raises(OCRError, match="DeepSeek API key not configured"):
-                ocr.extract_text(image_path)
-        finally:
-            os.unlink(image_path)
+        with pytest.raises(OCRError, match="DeepSeek API key not configured"):
+            ocr.extract_text(image_path)
     
     @patch('app.ocr.deepseek_ocr.requests.post')
-    def test_api_timeout(self, mock_post):
+    def test_api_timeout(self, mock_post, config):
         """Test API timeout handling"""
         import requests
         mock_post.side_effect = requests.Timeout("Request timed out")
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         image_path = self.create_test_image()
         
-        try:
-            with pytest.raises(OCRError):
-                ocr.extract_text(image_path)
-        finally:
-            os.unlink(image_path)
+        with pytest.raises(OCRError):
+            ocr.extract_text(image_path)
     
-    def test_preprocessing_integration(self):
+    def test_preprocessing_integration(self, config):
         """Test integration with image preprocessing"""
         # Enable preprocessing
-        self.config.ocr.preprocessing.enabled = True
+        config.ocr.preprocessing.enabled = True
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(config)
         
         # Mock the image processor
         with patch.object(ocr.image_processor, 'preprocess_image') as mock_preprocess:
@@ -334,41 +502,38 @@ class TestDeepSeekOCR:
             assert ocr.config.ocr.preprocessing.enabled == True
 
 
-@patch('app.ocr.deepseek_ocr.AutoTokenizer')
-@patch('app.ocr.deepseek_ocr.AutoModelForCausalLM')
+@patch('app.ocr.deepseek_ocr._lazy_transformers')
 @patch('app.ocr.deepseek_ocr.os.path.exists')
 class TestDeepSeekOCRLocalMode:
     """Test DeepSeek OCR in local mode"""
     
-    def setup_method(self):
-        """Set up test fixtures for local mode"""
-        self.config = Config()
-        self.config.model.use_local = True
-        self.config.model.local_path = "./test_models/deepseek"
-    
-    def test_local_model_loading_success(self, mock_exists, mock_model, mock_tokenizer):
+    def test_local_model_loading_success(self, mock_exists, mock_transformers, local_config):
         """Test successful local model loading"""
+        mock_tokenizer = mock_transformers.return_value.AutoTokenizer
+        mock_model = mock_transformers.return_value.AutoModelForCausalLM
         mock_exists.return_value = True
         mock_tokenizer.from_pretrained.return_value = Mock()
         mock_model.from_pretrained.return_value = Mock()
         
-        ocr = DeepSeekOCR(self.config)
+        ocr = DeepSeekOCR(local_config)
         
         assert ocr.model is not None
         assert ocr.tokenizer is not None
         mock_tokenizer.from_pretrained.assert_called_once()
         mock_model.from_pretrained.assert_called_once()
     
-    def test_local_model_loading_different_precision(self, mock_exists, mock_model, mock_tokenizer):
+    def test_local_model_loading_different_precision(self, mock_exists, mock_transformers, local_config):
         """Test local model loading with different precision settings"""
+        mock_tokenizer = mock_transformers.return_value.AutoTokenizer
+        mock_model = mock_transformers.return_value.AutoModelForCausalLM
         mock_exists.return_value = True
         mock_tokenizer.from_pretrained.return_value = Mock()
         mock_model_instance = Mock()
         mock_model.from_pretrained.return_value = mock_model_instance
         
         # Test fp16 precision
-        self.config.model.precision = "fp16"
-        ocr = DeepSeekOCR(self.config)
+        local_config.model.precision = "fp16"
+        ocr = DeepSeekOCR(local_config)
         
         # Verify model was loaded with fp16 settings
         call_args = mock_model.from_pretrained.call_args
@@ -376,13 +541,12 @@ class TestDeepSeekOCRLocalMode:
         
         # Test int8 precision
         mock_model.reset_mock()
-        self.config.model.precision = "int8"
-        ocr = DeepSeekOCR(self.config)
+        local_config.model.precision = "int8"
+        ocr = DeepSeekOCR(local_config)
         
         call_args = mock_model.from_pretrained.call_args
         assert 'load_in_8bit' in call_args[1]
 
 
 if __name__ == '__main__':
-    import pytest
     pytest.main([__file__])
\ No newline at end of file
@@ -3,8 +3,11 @@ Unit tests for image processing utilities
 """
 
 import os
+import copy
 import tempfile
+import pytest
 import numpy as np
+from io import BytesIO
 from PIL import Image
 from unittest.mock import patch, Mock
 
@@ -13,97 +16,141 @@ from app.utils.config import Config
 from app.utils.exceptions import ImageProcessingError
 
 
+@pytest.fixture(scope="module")
+def config():
+    """Default configuration shared by the module"""
+    return Config()
+
+
+@pytest.fixture(scope="module")
+def processor(config):
+    """Image processor built once from the shared configuration"""
+    return ImageProcessor(config)
+
+
 class TestImageProcessor:
     """Test image processing functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.config = Config()
-        self.processor = ImageProcessor(self.config)
-    
     def create_test_image(self, size=(100, 100), color='RGB'):
         """Create a test image"""
         image = Image.new(color, size, (255, 255, 255))
         return image
     
-    def test_image_processor_initialization(self):
+    def create_test_image_buffer(self, size=(100, 100), color='RGB', format='JPEG'):
+        """Create an encoded test image in memory"""
+        buf = BytesIO()
+        self.create_test_image(size, color).save(buf, format=format)
+        buf.seek(0)
+        return buf
+    
+    def test_image_processor_initialization(self, processor, config):
         """Test image processor initialization"""
-        assert self.processor.config == self.config
-        assert self.processor.max_size == self.config.ocr.max_image_size
+        assert processor.config == config
+        assert processor.max_size == config.ocr.max_image_size
     
-    def test_load_image_success(self):
+    def test_load_image_success(self, processor):
         """Test successful image loading"""
-        # Create temporary image file
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as f:
-            image = self.create_test_image((200, 200))
-            image.save(f.name, format='JPEG')
-            temp_path = f.name
+        loaded_image = processor.load_image(self.create_test_image_buffer((200, 200)))
+        assert isinstance(loaded_image, Image.Image)
+        assert loaded_image.mode == 'RGB'
+        assert loaded_image.size == (200, 200)
+    
+    def test_load_image_large_uses_cv2(self, processor, monkeypatch):
+        """Test large JPEGs are decoded with OpenCV and small ones with PIL"""
+        import cv2
         
-        try:
-            loaded_image = self.processor.load_image(temp_path)
-            assert isinstance(loaded_image, Image.Image)
-            assert loaded_image.mode == 'RGB'
-            assert loaded_image.size == (200, 200)
-        finally:
-            os.unlink(temp_path)
+        spy = Mock(side_effect=cv2.imdecode)
+        monkeypatch.setattr(cv2, 'imdecode', spy)
+        
+        processor.load_image(self.create_test_image_buffer((200, 200)))
+        spy.assert_not_called()
+        
+        buffer = BytesIO()
+        self.create_test_image((1600, 1200)).save(buffer, format='JPEG', dpi=(300, 300))
+        buffer.seek(0)
+        loaded_image = processor.load_image(buffer)
+        spy.assert_called_once()
+        assert loaded_image.mode == 'RGB'
+        assert max(loaded_image.size) == min(1600, processor.max_size)
+        # Container metadata survives the OpenCV decode
+        assert loaded_image.format == 'JPEG'
+        assert loaded_image.info['dpi'] == (300, 300)
     
-    def test_load_image_nonexistent_file(self):
+    def test_load_image_from_path(self, processor, tmp_path):
+        """Test loading an image from a file path"""
+        image_path = tmp_path / "image.jpg"
+        self.create_test_image((200, 200)).save(image_path, format='JPEG')
+        
+        loaded_image = processor.load_image(str(image_path))
+        assert loaded_image.size == (200, 200)
+    
+    def test_load_image_nonexistent_file(self, processor):
         """Test loading non-existent image file"""
         with pytest.raises(ImageProcessingError, match="Image file not found"):
-            self.processor.load_image("nonexistent.jpg")
+            processor.load_image("nonexistent.jpg")
+    
+    def test_load_image_single_filesystem_check(self, processor):
+        """Test a missing file is detected without a separate existence check"""
+        with patch('app.utils.image_processor.os.path.exists') as mock_exists:
+            with pytest.raises(ImageProcessingError, match="Image file not found"):
+                processor.load_image("nonexistent.jpg")
+        
+        mock_exists.assert_not_called()
     
-    def test_load_image_resize_large(self):
+    def test_load_image_resize_large(self, processor, config):
         """Test automatic resizing of large images"""
         # Create large image
         large_size = (5000, 5000)
-        with tempfile.NamedTemporaryFile(suffix='.jpg', delete=False) as f:
-            image = self.create_test_image(large_size)
-            image.save(f.name, format='JPEG')
-            temp_path = f.name
-        
-        try:
-            loaded_image = self.processor.load_image(temp_path)
-            # Should be resized to max_size
-            assert max(loaded_image.size) == self.config.ocr.max_image_size
-        finally:
-            os.unlink(temp_path)
+        loaded_image = processor.load_image(self.create_test_image_buffer(large_size))
+        # Should be resized to max_size
+        assert max(loaded_image.size) == config.ocr.max_image_size
     
-    def test_resize_image(self):
+    def test_resize_image(self, processor):
         """Test image resizing functionality"""
         image = self.create_test_image((1000, 800))
-        resized = self.processor._resize_image(image, 500)
+        resized = processor._resize_image(image, 500)
         
         # Should maintain aspect ratio
         assert max(resized.size) == 500
         assert resized.size[0] == 500  # Width should be the larger dimension
         assert resized.size[1] == 400  # Height should be proportional
     
-    def test_resize_image_already_small(self):
+    @patch('cv2.resize', side_effect=Exception("OpenCV unavailable"))
+    def test_resize_image_pil_fallback(self, mock_resize, processor):
+        """Test resizing falls back to PIL when OpenCV fails"""
+        image = self.create_test_image((1000, 800))
+        resized = processor._resize_image(image, 500)
+        
+        mock_resize.assert_called_once()
+        assert resized.size == (500, 400)
+        assert image.size == (1000, 800)  # Input left untouched
+    
+    def test_resize_image_already_small(self, processor):
         """Test resizing image that's already smaller than max size"""
         image = self.create_test_image((200, 150))
-        resized = self.processor._resize_image(image, 500)
+        resized = processor._resize_image(image, 500)
         
         # Should remain unchanged
         assert resized.size == (200, 150)
     
-    def test_optimize_size(self):
+    def test_optimize_size(self, processor):
         """Test size optimization for small images"""
         small_image = self.create_test_image((50, 50))
-        optimized = self.processor._optimize_size(small_image)
+        optimized = processor._optimize_size(small_image)
         
         # Should be upscaled
         assert max(optimized.size) >= 1000
     
-    def test_preprocess_image_enabled(self):
+    def test_preprocess_image_enabled(self, processor):
         """Test image preprocessing when enabled"""
         image = self.create_test_image((500, 400))
         
         # Mock the individual preprocessing methods
-        with patch.object(self.processor, '_optimize_size', return_value=image) as mock_resize, \
-             patch.object(self.processor, '_enhance_contrast', return_value=image) as mock_contrast, \
-             patch.object(self.processor, '_denoise_image', return_value=image) as mock_denoise:
+        with patch.object(processor, '_optimize_size', return_value=image) as mock_resize, \
+             patch.object(processor, '_enhance_contrast', return_value=image) as mock_contrast, \
+             patch.object(processor, '_denoise_image', return_value=image) as mock_denoise:
             
-            processed = self.processor.preprocess_image(image)
+            processed = processor.preprocess_image(image)
             
             # All preprocessing steps should be called when enabled
             mock_resize.assert_called_once()
@@ -111,11 +158,12 @@ class TestImageProcessor:
             mock_denoise.assert_called_once()
             assert processed == image
     
-    def test_preprocess_image_disabled(self):
+    def test_preprocess_image_disabled(self, config):
         """Test image preprocessing when disabled"""
-        # Disable preprocessing
-        self.config.ocr.preprocessing.enabled = False
-        processor = ImageProcessor(self.config)
+        # Disable preprocessing on a private copy of the shared config
+        config = copy.deepcopy(config)
+        config.ocr.preprocessing.enabled = False
+        processor = ImageProcessor(config)
         
         image = self.create_test_image((500, 400))
         processed = processor.preprocess_image(image)
@@ -125,7 +173,7 @@ class TestImageProcessor:
     
     @patch('cv2.cvtColor')
     @patch('cv2.createCLAHE')
-    def test_enhance_contrast(self, mock_clahe, mock_cvt):
+    def test_enhance_contrast(self, mock_clahe, mock_cvt, processor):
         """Test contrast enhancement"""
         image = self.create_test_image((100, 100))
         
@@ -137,15 +185,15 @@ class TestImageProcessor:
         mock_clahe.return_value = mock_clahe_obj
         
         try:
-            enhanced = self.processor._enhance_contrast(image)
+            enhanced = processor._enhance_contrast(image)
             assert isinstance(enhanced, Image.Image)
         except Exception:
             # If OpenCV is not available, should return original image
-            enhanced = self.processor._enhance_contrast(image)
+            enhanced = processor._enhance_contrast(image)
             assert enhanced == image
     
-    @patch('cv2.fastNlMeansDenoisingColored')
-    def test_denoise_image(self, mock_denoise):
+    @patch('cv2.bilateralFilter')
+    def test_denoise_image(self, mock_denoise, processor):
         """Test image denoising"""
         image = self.create_test_image((100, 100))
         
@@ -153,34 +201,49 @@ class TestImageProcessor:
         mock_denoise.return_value = np.array(image)
         
         try:
-            denoised = self.processor._denoise_image(image)
+            denoised = processor._denoise_image(image)
             assert isinstance(denoised, Image.Image)
         except Exception:
             # If OpenCV is not available, should return original image
-            denoised = self.processor._denoise_image(image)
+            denoised = processor._denoise_image(image)
             assert denoised == image
     
-    def test_detect_text_regions(self):
+    def test_detect_text_regions(self, processor):
         """Test text region detection"""
         image = self.create_test_image((200, 200))
         
         try:
-            regions = self.processor.detect_text_regions(image)
+            regions = processor.detect_text_regions(image)
             assert isinstance(regions, list)
             # Each region should be a tuple of coordinates
             for region in regions:
                 assert len(region) == 4  # (x1, y1, x2, y2)
         except Exception:
             # If OpenCV is not available, should return empty list
-            regions = self.processor.detect_text_regions(image)
+            regions = processor.detect_text_regions(image)
             assert regions == []
     
-    def test_crop_text_regions(self):
+    def test_detect_text_regions_kernels_cached(self, config):
+        """Test the structuring elements are built once and reused"""
+        import cv2
+        
+        processor = ImageProcessor(config)
+        image = self.create_test_image((200, 200))
+        
+        with patch('cv2.getStructuringElement', side_effect=cv2.getStructuringElement) as spy:
+            processor.detect_text_regions(image)
+            kernels = processor._text_kernels
+            processor.detect_text_regions(image)
+        
+        assert spy.call_count == 2
+        assert processor._text_kernels is kernels
+    
+    def test_crop_text_regions(self, processor):
         """Test cropping text regions from image"""
         image = self.create_test_image((200, 200))
         regions = [(10, 10, 50, 50), (100, 100, 150, 150)]
         
-        cropped = self.processor.crop_text_regions(image, regions)
+        cropped = processor.crop_text_regions(image, regions)
         
         assert len(cropped) == 2
         for i, crop_data in enumerate(cropped):
@@ -191,7 +254,7 @@ class TestImageProcessor:
             assert crop_data['bbox'] == regions[i]
             assert crop_data['region_id'] == i
     
-    def test_save_processed_image(self):
+    def test_save_processed_image(self, processor):
         """Test saving processed image"""
         image = self.create_test_image((100, 100))
         
@@ -202,7 +265,7 @@ class TestImageProcessor:
             # Remove the file so we can test creation
             os.unlink(temp_path)
             
-            success = self.processor.save_processed_image(image, temp_path)
+            success = processor.save_processed_image(image, temp_path)
             assert success == True
             assert os.path.exists(temp_path)
             
@@ -213,39 +276,34 @@ class TestImageProcessor:
             if os.path.exists(temp_path):
                 os.unlink(temp_path)
     
-    def test_save_processed_image_invalid_path(self):
+    def test_save_processed_image_invalid_path(self, processor):
         """Test saving image to invalid path"""
         image = self.create_test_image((100, 100))
         
         # Try to save to invalid path
-        success = self.processor.save_processed_image(image, "/invalid/path/image.jpg")
+        success = processor.save_processed_image(image, "/invalid/path/image.jpg")
         assert success == False
     
-    def test_convert_modes(self):
+    def test_convert_modes(self, processor):
         """Test image mode conversions"""
         # Test RGBA to RGB conversion
-        with tempfile.NamedTemporaryFile(suffix='.png', delete=False) as f:
-            rgba_image = Image.new('RGBA', (100, 100), (255, 255, 255, 128))
-            rgba_image.save(f.name, format='PNG')
-            temp_path = f.name
+        buf = BytesIO()
+        Image.new('RGBA', (100, 100), (255, 255, 255, 128)).save(buf, format='PNG')
+        buf.seek(0)
         
-        try:
-            loaded_image = self.processor.load_image(temp_path)
-            assert loaded_image.mode == 'RGB'
-        finally:
-            os.unlink(temp_path)
+        loaded_image = processor.load_image(buf)
+        assert loaded_image.mode == 'RGB'
     
-    def test_preprocessing_error_handling(self):
+    def test_preprocessing_error_handling(self, processor):
         """Test error handling in preprocessing"""
         image = self.create_test_image((100, 100))
         
         # Test with mock that raises exception
-        with patch.object(self.processor, '_enhance_contrast', side_effect=Exception("Test error")):
+        with patch.object(processor, '_enhance_contrast', side_effect=Exception("Test error")):
             # Should not raise exception, but continue processing
-            processed = self.processor.preprocess_image(image)
+            processed = processor.preprocess_image(image)
             assert isinstance(processed, Image.Image)
 
 
 if __name__ == '__main__':
-    import pytest
     pytest.main([__file__])
\ No newline at end of file
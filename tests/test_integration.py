@@ -2,42 +2,35 @@
 Integration tests for the complete OCR pipeline
 """
 
+import logging
 import pytest
 import tempfile
 import shutil
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from unittest.mock import patch, Mock
+from unittest.mock import Mock
+from loguru import logger
 
 from tests.utils.test_helpers import (
-    test_helpers,
     image_helper, 
     APITestClient,
-    performance_helper
+    PerformanceTestHelper
 )
 from tests.data.test_data import SAMPLE_TEXTS, EXPECTED_RESULTS
 
 
+@pytest.fixture
+def perf():
+    """Performance timings private to one test"""
+    return PerformanceTestHelper()
+
+
 class TestOCRPipeline:
     """Test complete OCR pipeline integration"""
     
-    def setup_method(self):
-        """Setup for each test"""
-        self.temp_dir = test_helpers.create_temp_dir()
-        performance_helper.metrics.clear()
-    
-    def teardown_method(self):
-        """Cleanup after each test"""
-        test_helpers.cleanup_temp_dir(self.temp_dir)
-    
     @pytest.mark.integration
-    @patch('app.ocr.deepseek_ocr.AutoModelForCausalLM')
-    @patch('app.ocr.deepseek_ocr.AutoProcessor')
-    def test_end_to_end_ocr_processing(self, mock_processor, mock_model, test_app):
+    def test_end_to_end_ocr_processing(self, perf, test_app):
         """Test complete end-to-end OCR processing"""
-        # Setup mocks
-        mock_model.from_pretrained.return_value = Mock()
-        mock_processor.from_pretrained.return_value = Mock()
-        
         # Create test client
         client = APITestClient(test_app)
         
@@ -45,13 +38,13 @@ class TestOCRPipeline:
         image_bytes = image_helper.create_test_image_bytes(300, 200)
         
         # Test OCR processing
-        performance_helper.start_timer('ocr_processing')
+        perf.start_timer('ocr_processing')
         result, status = client.upload_image(
             image_bytes, 
             filename="test.jpg",
             extract_format="plain"
         )
-        performance_helper.end_timer('ocr_processing')
+        perf.end_timer('ocr_processing')
         
         # Assertions
         assert status == 200
@@ -60,29 +53,21 @@ class TestOCRPipeline:
         assert 'processing_time' in result
         
         # Performance assertion
-        performance_helper.assert_performance('ocr_processing', 30.0)
+        perf.assert_performance('ocr_processing', 30.0)
     
     @pytest.mark.integration
-    @patch('app.ocr.deepseek_ocr.AutoModelForCausalLM')
-    @patch('app.ocr.deepseek_ocr.AutoProcessor')
-    def test_batch_processing_pipeline(self, mock_processor, mock_model, test_app):
+    def test_batch_processing_pipeline(self, perf, test_app):
         """Test batch processing pipeline"""
-        # Setup mocks
-        mock_model.from_pretrained.return_value = Mock()
-        mock_processor.from_pretrained.return_value = Mock()
-        
         client = APITestClient(test_app)
         
-        # Create multiple test images
-        images = [
-            (image_helper.create_test_image_bytes(200, 150), f"test_{i}.jpg")
-            for i in range(3)
-        ]
+        # Create multiple test images sharing one encoded payload
+        image_bytes = image_helper.create_test_image_bytes(200, 150)
+        images = [(image_bytes, f"test_{i}.jpg") for i in range(3)]
         
         # Test batch processing
-        performance_helper.start_timer('batch_processing')
+        perf.start_timer('batch_processing')
         result, status = client.upload_multiple_images(images)
-        performance_helper.end_timer('batch_processing')
+        perf.end_timer('batch_processing')
         
         # Assertions
         assert status == 200
@@ -107,13 +92,30 @@ class TestOCRPipeline:
         assert 'error' in result
     
     @pytest.mark.integration
-    @patch('app.ocr.deepseek_ocr.AutoModelForCausalLM')
-    def test_model_fallback_pipeline(self, mock_model, test_app):
+    def test_model_fallback_pipeline(self, _mock_hf, monkeypatch, tmp_path):
         """Test model fallback mechanism"""
-        # Make model loading fail
-        mock_model.from_pretrained.side_effect = Exception("Model loading failed")
+        from app.main import create_app
+        from app.utils.config import invalidate_config_cache
         
-        client = APITestClient(test_app)
+        mock_model, _ = _mock_hf
+        
+        # Make model loading fail for this test only
+        from_pretrained = Mock(side_effect=Exception("Model loading failed"))
+        monkeypatch.setattr(mock_model, 'from_pretrained', from_pretrained)
+        
+        # Build a local-mode app so startup actually tries to load the model
+        monkeypatch.setenv('USE_LOCAL_MODEL', 'true')
+        monkeypatch.setenv('MODEL_PATH', str(tmp_path))
+        invalidate_config_cache()
+        try:
+            app = create_app()
+        finally:
+            invalidate_config_cache()
+        app.config['TESTING'] = True
+        
+        from_pretrained.assert_called_once()
+        
+        client = APITestClient(app)
         image_bytes = image_helper.create_test_image_bytes()
         
         # This should still work with API fallback
@@ -124,16 +126,8 @@ class TestOCRPipeline:
         assert status in [200, 503]  # Success or service unavailable
     
     @pytest.mark.integration
-    @patch('app.ocr.deepseek_ocr.AutoModelForCausalLM')
-    @patch('app.ocr.deepseek_ocr.AutoProcessor') 
-    def test_structured_extraction_pipeline(self, mock_processor, mock_model, test_app):
+    def test_structured_extraction_pipeline(self, test_app):
         """Test structured data extraction pipeline"""
-        # Setup mocks to return structured data
-        mock_model_instance = Mock()
-        mock_model_instance.generate.return_value = Mock()
-        mock_model.from_pretrained.return_value = mock_model_instance
-        mock_processor.from_pretrained.return_value = Mock()
-        
         client = APITestClient(test_app)
         image_bytes = image_helper.create_test_image_bytes()
         
@@ -148,32 +142,32 @@ class TestOCRPipeline:
     
     @pytest.mark.integration
     @pytest.mark.slow
-    def test_performance_under_load(self, test_app):
+    def test_performance_under_load(self, perf, test_app):
         """Test system performance under load"""
-        client = APITestClient(test_app)
+        # Build one payload and share it; bytes are immutable and each
+        # upload wraps them in its own stream
+        image_data = image_helper.create_test_image_bytes(100, 100)
+        images = [image_data] * 10
         
-        # Create multiple test images
-        images = [
-            image_helper.create_test_image_bytes(100, 100)
-            for _ in range(10)
-        ]
+        def upload(item):
+            # Flask test clients are not thread-safe; give each upload its own
+            index, image_data = item
+            return APITestClient(test_app).upload_image(image_data, f"load_test_{index}.jpg")
         
         # Test concurrent processing
-        performance_helper.start_timer('load_test')
+        perf.start_timer('load_test')
         
-        results = []
-        for i, image_bytes in enumerate(images):
-            result, status = client.upload_image(image_bytes, f"load_test_{i}.jpg")
-            results.append((result, status))
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(executor.map(upload, enumerate(images)))
         
-        performance_helper.end_timer('load_test')
+        perf.end_timer('load_test')
         
         # Assertions
         successful_results = [r for r, s in results if s == 200]
         assert len(successful_results) >= 8  # At least 80% success rate
         
         # Performance should be reasonable even under load
-        performance_helper.assert_performance('load_test', 60.0)
+        perf.assert_performance('load_test', 60.0)
 
 
 class TestConfigurationIntegration:
@@ -193,17 +187,23 @@ class TestConfigurationIntegration:
         assert hasattr(config, 'ocr')
     
     @pytest.mark.integration
+    @pytest.mark.xdist_group("ocr")  # Mutates process environment
     def test_environment_override(self, monkeypatch, test_app):
         """Test environment variable configuration override"""
-        # Set environment variable
-        monkeypatch.setenv('OCR_MAX_FILE_SIZE', '20971520')  # 20MB
-        
-        # Reload config (this depends on implementation)
-        from app.utils.config import get_config
-        config = get_config()
+        from app.utils.config import get_config, invalidate_config_cache
         
-        # Verify override took effect
-        assert config.ocr.max_file_size == 20971520
+        # Set environment variable
+        monkeypatch.setenv('MAX_FILE_SIZE', '20971520')  # 20MB
+        
+        # Re-parse with the override; drop it again so later tests see the real environment
+        invalidate_config_cache()
+        try:
+            config = get_config()
+            
+            # Verify override took effect
+            assert config.upload.max_file_size == 20971520
+        finally:
+            invalidate_config_cache()
 
 
 class TestHealthAndMonitoring:
@@ -230,9 +230,18 @@ class TestHealthAndMonitoring:
         """Test logging integration across components"""
         client = APITestClient(test_app)
         
-        # Make request that should generate logs
-        image_bytes = image_helper.create_test_image_bytes()
-        client.upload_image(image_bytes)
+        # Capture only INFO and above from application modules
+        caplog.set_level(logging.INFO, logger='app')
+        caplog.handler.addFilter(lambda record: record.name.startswith('app'))
+        
+        # The app logs through loguru; forward its records into caplog
+        handler_id = logger.add(caplog.handler, format="{message}", level="INFO", filter="app")
+        try:
+            # Make request that should generate logs
+            image_bytes = image_helper.create_test_image_bytes()
+            client.upload_image(image_bytes)
+        finally:
+            logger.remove(handler_id)
         
         # Check that logs were generated
         assert len(caplog.records) > 0
@@ -246,18 +255,20 @@ class TestSecurityIntegration:
     """Test security features integration"""
     
     @pytest.mark.integration
-    def test_file_size_limits(self, test_app):
+    def test_file_size_limits(self, monkeypatch, test_app):
         """Test file size limit enforcement"""
+        # Lower the limit for this test only so a small payload exceeds it
+        monkeypatch.setitem(test_app.config, 'MAX_CONTENT_LENGTH', 1024 * 1024)  # 1MB
         client = APITestClient(test_app)
         
         # Create oversized file
-        large_image = image_helper.create_large_image_bytes(15)  # 15MB
+        large_image = image_helper.create_large_image_bytes(2)  # 2MB
         
         result, status = client.upload_image(large_image, "large.jpg")
         
-        assert status == 400
-        assert 'error' in result
-        assert 'size' in result['error'].lower()
+        # Rejected on Content-Length before the body is read
+        assert status == 413
+        assert result['error'] == 'File too large'
     
     @pytest.mark.integration
     def test_file_type_validation(self, test_app):
@@ -0,0 +1,125 @@
+"""
+Unit tests for the LogTestHelper test utility
+"""
+
+import logging
+import pytest
+
+from tests.utils.test_helpers import LogTestHelper
+
+
+@pytest.fixture
+def log_capture(request):
+    """Fresh helper capturing a logger unique to the test"""
+    helper = LogTestHelper()
+    logger = logging.getLogger(f"log_helper.{request.node.name}")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    helper.capture_logs(logger.name)
+    yield helper, logger
+    helper.release()
+
+
+class TestLogTestHelper:
+    """Test cases for LogTestHelper"""
+    
+    def test_captured_logs_keep_dict_entries(self, log_capture):
+        """Test captured records keep level, message and module"""
+        helper, logger = log_capture
+        logger.warning("disk almost full")
+        
+        assert helper.captured_logs == [
+            {'level': 'WARNING', 'message': 'disk almost full', 'module': 'test_log_helper'}
+        ]
+    
+    def test_handler_attached_once_per_logger(self, log_capture):
+        """Test repeated capture_logs calls reuse the handler"""
+        helper, logger = log_capture
+        handler = helper.capture_logs(logger.name)
+        
+        assert logger.handlers.count(handler) == 1
+        logger.info("only once")
+        assert len(helper.captured_logs) == 1
+    
+    def test_release_detaches_handler(self, log_capture):
+        """Test release removes the handler from every captured logger"""
+        helper, logger = log_capture
+        other = logging.getLogger(f"{logger.name}.other")
+        other.propagate = False
+        handler = helper.capture_logs(other.name)
+        
+        helper.release()
+        
+        assert handler not in logger.handlers
+        assert handler not in other.handlers
+        logger.error("after release")
+        assert helper.captured_logs == []
+    
+    def test_assert_log_contains_by_level(self, log_capture):
+        """Test level-filtered lookups only see that level"""
+        helper, logger = log_capture
+        logger.info("model loaded")
+        logger.error("model crashed")
+        
+        assert helper.assert_log_contains("loaded", level="INFO")
+        assert helper.assert_log_contains("crashed", level="ERROR")
+        with pytest.raises(AssertionError, match="at level ERROR"):
+            helper.assert_log_contains("loaded", level="ERROR")
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("anything", level="DEBUG")
+    
+    def test_assert_log_contains_exact_and_substring(self, log_capture):
+        """Test lookups without a level match exact and partial messages"""
+        helper, logger = log_capture
+        logger.info("processing image 1")
+        
+        assert helper.assert_log_contains("processing image 1")
+        assert helper.assert_log_contains("image")
+        with pytest.raises(AssertionError, match="'missing' not found"):
+            helper.assert_log_contains("missing")
+    
+    def test_new_logs_advances_cursor(self, log_capture):
+        """Test new_logs only yields records not seen before"""
+        helper, logger = log_capture
+        logger.info("first")
+        logger.info("second")
+        
+        assert [log['message'] for log in helper.new_logs()] == ["first", "second"]
+        assert list(helper.new_logs()) == []
+        
+        logger.info("third")
+        assert [log['message'] for log in helper.new_logs()] == ["third"]
+    
+    def test_incremental_assert_skips_seen_logs(self, log_capture):
+        """Test incremental assertions ignore logs already consumed"""
+        helper, logger = log_capture
+        logger.info("request started")
+        
+        assert helper.assert_log_contains("started", incremental=True)
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("started", incremental=True)
+        
+        logger.warning("request slow")
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("slow", level="ERROR", incremental=True)
+        # The failed lookup consumed the record as well
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("slow", incremental=True)
+        # Non-incremental lookups still see everything
+        assert helper.assert_log_contains("started")
+    
+    def test_clear_logs_resets_cursor_and_indexes(self, log_capture):
+        """Test clear_logs drops records, indexes and the cursor"""
+        helper, logger = log_capture
+        logger.info("old message")
+        list(helper.new_logs())
+        
+        helper.clear_logs()
+        
+        assert helper.captured_logs == []
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("old message")
+        with pytest.raises(AssertionError):
+            helper.assert_log_contains("old message", level="INFO")
+        logger.info("new message")
+        assert [log['message'] for log in helper.new_logs()] == ["new message"]
@@ -2,161 +2,155 @@
 Unit tests for validation utilities
 """
 
-import io
+import copy
 import tempfile
+import pytest
 from unittest.mock import Mock
 
 from app.utils.validation import FileValidator, InputValidator
 from app.utils.config import Config
 from app.utils.exceptions import ValidationError
+from tests.utils.test_helpers import _FakeUpload
 
 
-class MockFileStorage:
-    """Mock file storage for testing"""
+@pytest.fixture(scope="class")
+def validator():
+    """File validator built once per test class"""
+    return FileValidator(Config())
+
+
+# Payloads above this spill from memory to a temporary file, like werkzeug uploads
+_SPOOL_MAX_SIZE = 1 << 20
+
+
+class MockFileStorage(tempfile.SpooledTemporaryFile):
+    """Mock file storage for testing, backed by a spooled temporary file"""
     
-    def __init__(self, filename, content=b"test content", content_type="image/jpeg"):
+    def __init__(self, filename, content=b"test content", content_type="image/jpeg", size=None):
+        super().__init__(max_size=_SPOOL_MAX_SIZE)
         self.filename = filename
-        self.content = content
         self.content_type = content_type
-        self._stream = io.BytesIO(content)
-        self._position = 0
-    
-    def seek(self, position, whence=0):
-        if whence == 2:  # SEEK_END
-            self._position = len(self.content)
-        elif whence == 1:  # SEEK_CUR
-            self._position += position
-        else:  # SEEK_SET
-            self._position = position
-        self._stream.seek(self._position)
-    
-    def tell(self):
-        return self._position
-    
-    def read(self, size=-1):
-        if size == -1:
-            data = self.content[self._position:]
-            self._position = len(self.content)
-        else:
-            data = self.content[self._position:self._position + size]
-            self._position += len(data)
-        return data
+        self.write(content)
+        if size is not None and size > len(content):
+            # Zero-pad to the requested size; on disk the padding stays sparse
+            if size > _SPOOL_MAX_SIZE:
+                self.rollover()
+            self.seek(size - 1)
+            self.write(b"\0")
+        self.seek(0)
 
 
 class TestFileValidator:
     """Test file validation functionality"""
     
-    def setup_method(self):
-        """Set up test fixtures"""
-        self.config = Config()
-        self.validator = FileValidator(self.config)
-    
-    def test_file_validator_initialization(self):
+    def test_file_validator_initialization(self, validator):
         """Test file validator initialization"""
-        assert self.validator.config == self.config
-        assert 'jpg' in self.validator.allowed_extensions
-        assert 'png' in self.validator.allowed_extensions
-        assert self.validator.max_file_size == self.config.upload.max_file_size
+        assert validator.config == Config()
+        assert 'jpg' in validator.allowed_extensions
+        assert 'png' in validator.allowed_extensions
+        assert validator.max_file_size == validator.config.upload.max_file_size
     
-    def test_validate_file_success(self):
+    def test_validate_file_success(self, validator):
         """Test successful file validation"""
         # Create mock file with JPEG header
         jpeg_header = b'\xff\xd8\xff'
-        file_mock = MockFileStorage("test.jpg", jpeg_header + b"fake jpeg data")
-        
-        result = self.validator.validate_file(file_mock)
+        with MockFileStorage("test.jpg", jpeg_header + b"fake jpeg data") as file_mock:
+            result = validator.validate_file(file_mock)
         assert result == True
     
-    def test_validate_file_no_file(self):
+    def test_validate_file_no_file(self, validator):
         """Test validation with no file"""
         with pytest.raises(ValidationError, match="No file provided"):
-            self.validator.validate_file(None)
+            validator.validate_file(None)
     
-    def test_validate_file_no_filename(self):
+    def test_validate_file_no_filename(self, validator):
         """Test validation with empty filename"""
-        file_mock = MockFileStorage("", b"content")
-        file_mock.filename = ""
-        
-        with pytest.raises(ValidationError, match="No file provided"):
-            self.validator.validate_file(file_mock)
+        with MockFileStorage("", b"content") as file_mock:
+            file_mock.filename = ""
+            
+            with pytest.raises(ValidationError, match="No file provided"):
+                validator.validate_file(file_mock)
     
-    def test_validate_file_invalid_extension(self):
+    def test_validate_file_invalid_extension(self, validator):
         """Test validation with invalid file extension"""
-        file_mock = MockFileStorage("test.txt", b"text content")
-        
-        with pytest.raises(ValidationError, match="File type not allowed"):
-            self.validator.validate_file(file_mock)
+        with MockFileStorage("test.txt", b"text content") as file_mock:
+            with pytest.raises(ValidationError, match="File type not allowed"):
+                validator.validate_file(file_mock)
     
-    def test_validate_file_too_large(self):
+    def test_validate_file_too_large(self, validator):
         """Test validation with file too large"""
-        # Create large content that exceeds max file size
-        large_content = b"x" * (self.config.upload.max_file_size + 1)
-        file_mock = MockFileStorage("test.jpg", large_content)
-        
-        with pytest.raises(ValidationError, match="File too large"):
-            self.validator.validate_file(file_mock)
-    
-    def test_is_allowed_extension_valid(self):
-        """Test allowed extension checking with valid extensions"""
-        assert self.validator._is_allowed_extension("image.jpg") == True
-        assert self.validator._is_allowed_extension("image.JPG") == True  # Case insensitive
-        assert self.validator._is_allowed_extension("document.pdf") == True
-        assert self.validator._is_allowed_extension("photo.png") == True
-    
-    def test_is_allowed_extension_invalid(self):
-        """Test allowed extension checking with invalid extensions"""
-        assert self.validator._is_allowed_extension("document.txt") == False
-        assert self.validator._is_allowed_extension("script.py") == False
-        assert self.validator._is_allowed_extension("archive.zip") == False
-        assert self.validator._is_allowed_extension("no_extension") == False
-    
-    def test_is_valid_size_within_limit(self):
+        # Pad past max file size; the spilled file is sparse, not allocated
+        with MockFileStorage("test.jpg", b"\xff\xd8\xff",
+                             size=validator.max_file_size + 1) as file_mock:
+            with pytest.raises(ValidationError, match="File too large"):
+                validator.validate_file(file_mock)
+    
+    @pytest.mark.parametrize("name, expected", [
+        ("image.jpg", True),
+        ("image.JPG", True),  # Case insensitive
+        ("document.pdf", True),
+        ("photo.png", True),
+        ("document.txt", False),
+        ("script.py", False),
+        ("archive.zip", False),
+        ("no_extension", False),
+    ])
+    def test_is_allowed_extension(self, validator, name, expected):
+        """Test allowed extension checking"""
+        assert validator._is_allowed_extension(name) is expected
+    
+    def test_is_valid_size_within_limit(self, validator):
         """Test file size validation within limit"""
         small_content = b"small content"
-        file_mock = MockFileStorage("test.jpg", small_content)
-        
-        assert self.validator._is_valid_size(file_mock) == True
+        with MockFileStorage("test.jpg", small_content) as file_mock:
+            assert validator._is_valid_size(file_mock) == True
     
-    def test_is_valid_size_exceeds_limit(self):
+    def test_is_valid_size_exceeds_limit(self, validator):
         """Test file size validation exceeding limit"""
-        large_content = b"x" * (self.config.upload.max_file_size + 1)
-        file_mock = MockFileStorage("test.jpg", large_content)
-        
-        assert self.validator._is_valid_size(file_mock) == False
-    
-    def test_is_valid_mime_type_image(self):
-        """Test MIME type validation for images"""
-        # JPEG header
-        jpeg_file = MockFileStorage("test.jpg", b'\xff\xd8\xff\xe0\x00\x10JFIF')
-        assert self.validator._is_valid_mime_type(jpeg_file) == True
+        with MockFileStorage("test.jpg", b"\xff\xd8\xff",
+                             size=validator.max_file_size + 1) as file_mock:
+            assert validator._is_valid_size(file_mock) == False
+    
+    @pytest.mark.parametrize("filename, header, expected", [
+        # Recognised from the filename
+        ("test.jpg", b'\xff\xd8\xff\xe0\x00\x10JFIF', True),
+        ("test.png", b'\x89PNG\r\n\x1a\n', True),
+        ("test.bmp", b'BM', True),
+        ("test.pdf", b'%PDF-1.4', True),
+        # Recognised from the content signature alone
+        ("upload", b'\xff\xd8\xff\xe0\x00\x10JFIF', True),
+        ("upload", b'\x89PNG\r\n\x1a\n', True),
+        ("upload", b'BM', True),
+        ("upload", b'%PDF-1.4', True),
+        ("upload", b'GIF89a', True),
+        # Neither filename nor content identify an accepted type
+        ("upload", b'plain text', False),
+        ("test.txt", b'plain text content', False),
+    ], ids=["jpeg_name", "png_name", "bmp_name", "pdf_name",
+            "jpeg_sig", "png_sig", "bmp_sig", "pdf_sig", "gif_sig",
+            "unknown_sig", "text_file"])
+    def test_is_valid_mime_type(self, validator, filename, header, expected):
+        """Test MIME type validation by filename and content signature"""
+        with MockFileStorage(filename, header) as file_mock:
+            assert validator._is_valid_mime_type(file_mock) is expected
+    
+    def test_is_valid_mime_type_fake_upload(self, validator):
+        """Test the helper upload stand-in supports the header sniff"""
+        upload = _FakeUpload(b'\x89PNG\r\n\x1a\n' + b'x' * 64, "upload", "application/octet-stream")
         
-        # PNG header
-        png_file = MockFileStorage("test.png", b'\x89PNG\r\n\x1a\n')
-        assert self.validator._is_valid_mime_type(png_file) == True
-        
-        # BMP header
-        bmp_file = MockFileStorage("test.bmp", b'BM')
-        assert self.validator._is_valid_mime_type(bmp_file) == True
-    
-    def test_is_valid_mime_type_pdf(self):
-        """Test MIME type validation for PDF"""
-        pdf_file = MockFileStorage("test.pdf", b'%PDF-1.4')
-        assert self.validator._is_valid_mime_type(pdf_file) == True
-    
-    def test_is_valid_mime_type_invalid(self):
-        """Test MIME type validation for invalid files"""
-        text_file = MockFileStorage("test.txt", b'plain text content')
-        # Note: This might pass due to filename-based MIME detection
-        # The actual validation depends on the mimetypes.guess_type implementation
+        assert upload.read(8) == b'\x89PNG\r\n\x1a\n'
+        assert upload.tell() == 8
+        assert validator._is_valid_mime_type(upload) is True
+        assert upload.tell() == 0
+        assert len(upload.read()) == 72
     
-    def test_validate_file_comprehensive(self):
+    def test_validate_file_comprehensive(self, validator):
         """Test comprehensive file validation"""
         # Create a valid JPEG file
         jpeg_content = b'\xff\xd8\xff\xe0\x00\x10JFIF' + b'fake jpeg data'
-        valid_file = MockFileStorage("valid_image.jpg", jpeg_content)
-        
-        # Should pass all validations
-        result = self.validator.validate_file(valid_file)
+        with MockFileStorage("valid_image.jpg", jpeg_content) as valid_file:
+            # Should pass all validations
+            result = validator.validate_file(valid_file)
         assert result == True
 
 
@@ -203,6 +197,15 @@ class TestInputValidator:
         assert "\x00" not in result
         assert result == "Test promptwith nulls"
     
+    @pytest.mark.parametrize("prompt, expected", [
+        ("a\x00" * 500, "a" * 500),
+        ("bell\x07 and\x1b escape", "bell and escape"),
+        ("keep\ttabs\nand\r\nnewlines", "keep\ttabs\nand\r\nnewlines"),
+    ], ids=["many_nulls", "control_chars", "whitespace_kept"])
+    def test_validate_prompt_strips_control_characters(self, prompt, expected):
+        """Test control characters are removed while ordinary whitespace is kept"""
+        assert InputValidator.validate_prompt(prompt) == expected
+    
     def test_validate_file_path_valid(self):
         """Test valid file path validation"""
         allowed_dirs = ["./uploads", "./results"]
@@ -221,6 +224,12 @@ class TestInputValidator:
         
         with pytest.raises(ValidationError, match="Path traversal not allowed"):
             InputValidator.validate_file_path("../secret.txt", allowed_dirs)
+        
+        with pytest.raises(ValidationError, match="Path traversal not allowed"):
+            InputValidator.validate_file_path("uploads\\..\\secret.txt", allowed_dirs)
+        
+        # Dots inside a name are not a parent-directory component
+        assert InputValidator.validate_file_path("./uploads/..file.jpg", allowed_dirs) == True
     
     def test_validate_file_path_outside_allowed(self):
         """Test file path validation outside allowed directories"""
@@ -231,6 +240,10 @@ class TestInputValidator:
         
         with pytest.raises(ValidationError, match="File path not in allowed directories"):
             InputValidator.validate_file_path("/etc/passwd", allowed_dirs)
+        
+        # Sibling directory sharing the allowed prefix
+        with pytest.raises(ValidationError, match="File path not in allowed directories"):
+            InputValidator.validate_file_path("./uploads_private/file.jpg", allowed_dirs)
     
     def test_validate_batch_size_valid(self):
         """Test valid batch size validation"""
@@ -267,30 +280,29 @@ class TestInputValidator:
 class TestValidationIntegration:
     """Integration tests for validation utilities"""
     
-    def test_file_validator_integration(self):
+    def test_file_validator_integration(self, validator):
         """Test file validator integration with config"""
-        # Create custom config
-        config = Config()
+        # Customise a copy of the shared config instead of building a new one
+        config = copy.deepcopy(validator.config)
         config.upload.max_file_size = 1024  # 1KB limit
         config.upload.allowed_extensions = ['jpg', 'png']
         
         validator = FileValidator(config)
         
         # Test with small valid file
-        small_jpeg = MockFileStorage("small.jpg", b'\xff\xd8\xff' + b'x' * 100)
-        assert validator.validate_file(small_jpeg) == True
+        with MockFileStorage("small.jpg", b'\xff\xd8\xff' + b'x' * 100) as small_jpeg:
+            assert validator.validate_file(small_jpeg) == True
         
         # Test with large file
-        large_jpeg = MockFileStorage("large.jpg", b'\xff\xd8\xff' + b'x' * 2000)
-        with pytest.raises(ValidationError, match="File too large"):
-            validator.validate_file(large_jpeg)
+        with MockFileStorage("large.jpg", b'\xff\xd8\xff', size=2003) as large_jpeg:
+            with pytest.raises(ValidationError, match="File too large"):
+                validator.validate_file(large_jpeg)
         
         # Test with disallowed extension
-        gif_file = MockFileStorage("image.gif", b'GIF89a')
-        with pytest.raises(ValidationError, match="File type not allowed"):
-            validator.validate_file(gif_file)
+        with MockFileStorage("image.gif", b'GIF89a') as gif_file:
+            with pytest.raises(ValidationError, match="File type not allowed"):
+                validator.validate_file(gif_file)
 
 
 if __name__ == '__main__':
-    import pytest
     pytest.main([__file__])
\ No newline at end of file
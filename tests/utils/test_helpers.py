@@ -4,67 +4,161 @@ Test utility functions and helpers
 
 import os
 import json
+import time
+import array
+import logging
+import atexit
+import hashlib
 import tempfile
+import threading
 import shutil
-from typing import Dict, Any, List, Optional
-from unittest.mock import Mock, MagicMock
+import contextlib
+import functools
+from collections import OrderedDict
+from typing import Dict, Any, Iterator, List, Optional, Tuple
 from io import BytesIO
 import base64
 
+import yaml
+from werkzeug.datastructures import FileStorage, MultiDict
+from werkzeug.test import encode_multipart
+
+try:
+    from PIL import Image, ImageColor
+except ImportError:
+    Image = ImageColor = None
+
+try:
+    import numpy as np
+    import simplejpeg
+except ImportError:
+    simplejpeg = None
+
+# Prefer the libyaml-backed emitter when PyYAML was built with it
+try:
+    from yaml import CSafeDumper as YamlDumper
+except ImportError:
+    from yaml import SafeDumper as YamlDumper
+
+# RAM-backed scratch space on Linux; None lets tempfile pick its default
+_TMPFS = '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else None
+
+
+@functools.lru_cache(maxsize=4)
+def _large_payload(size_mb: int) -> bytes:
+    """Build a filler payload once per size"""
+    return b"x" * (size_mb * 1024 * 1024)
+
+
+class _FakeUpload:
+    """Plain stand-in for an uploaded file; use Mock where call assertions are needed"""
+    
+    __slots__ = ('filename', 'content_type', 'stream')
+    
+    def __init__(self, data: bytes, filename: str, content_type: str):
+        self.filename = filename
+        self.content_type = content_type
+        self.stream = BytesIO(data)
+    
+    def read(self, size: int = -1) -> bytes:
+        return self.stream.read(size)
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        return self.stream.seek(offset, whence)
+    
+    def tell(self) -> int:
+        return self.stream.tell()
+
+
+def _empty_dir(path: str):
+    """Remove everything inside a directory, keeping the directory itself"""
+    try:
+        entries = os.scandir(path)
+    except FileNotFoundError:
+        return  # Already removed by its user
+    with entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                _fast_rmtree(entry.path)
+            else:
+                os.unlink(entry.path)
+
+
+def _fast_rmtree(path: str):
+    """Delete a directory tree with scandir/unlink/rmdir, skipping rmtree's bookkeeping"""
+    _empty_dir(path)
+    os.rmdir(path)
+
 
 class TestHelpers:
     """Helper utilities for testing"""
     
+    # Empty directories waiting to be handed out again by temp_dir()
+    temp_dir_pool: List[str] = []
+    
     @staticmethod
     def create_temp_dir() -> str:
         """Create temporary directory for testing"""
-        return tempfile.mkdtemp()
+        return tempfile.mkdtemp(dir=_TMPFS)
+    
+    @staticmethod
+    @contextlib.contextmanager
+    def temp_dir() -> Iterator[str]:
+        """Borrow an empty temporary directory from the pool, emptied and returned on exit"""
+        pool = TestHelpers.temp_dir_pool
+        if pool:
+            path = pool.pop()
+        else:
+            path = tempfile.mkdtemp(dir=_TMPFS)
+            atexit.register(shutil.rmtree, path, ignore_errors=True)
+        try:
+            yield path
+        finally:
+            _empty_dir(path)
+            # Only recycle directories the borrower did not delete
+            if os.path.isdir(path):
+                pool.append(path)
     
     @staticmethod
     def cleanup_temp_dir(temp_dir: str):
         """Clean up temporary directory"""
         if os.path.exists(temp_dir):
-            shutil.rmtree(temp_dir)
+            try:
+                _fast_rmtree(temp_dir)
+            except OSError:
+                # Let rmtree deal with whatever the fast path could not remove
+                shutil.rmtree(temp_dir, ignore_errors=True)
     
     @staticmethod
-    def create_mock_image_file(filename: str = "test.jpg") -> Mock:
+    def create_mock_image_file(filename: str = "test.jpg") -> '_FakeUpload':
         """Create mock image file for testing"""
-        mock_file = Mock()
-        mock_file.filename = filename
-        mock_file.content_type = "image/jpeg"
-        mock_file.read.return_value = b"fake_image_data"
-        mock_file.stream = BytesIO(b"fake_image_data")
-        return mock_file
+        return _FakeUpload(b"fake_image_data", filename, "image/jpeg")
     
     @staticmethod
-    def create_mock_invalid_file(filename: str = "test.txt") -> Mock:
+    def create_mock_invalid_file(filename: str = "test.txt") -> '_FakeUpload':
         """Create mock invalid file for testing"""
-        mock_file = Mock()
-        mock_file.filename = filename
-        mock_file.content_type = "text/plain"
-        mock_file.read.return_value = b"not_image_data"
-        mock_file.stream = BytesIO(b"not_image_data")
-        return mock_file
+        return _FakeUpload(b"not_image_data", filename, "text/plain")
     
     @staticmethod
-    def create_large_mock_file(size_mb: int = 10) -> Mock:
+    def create_large_mock_file(size_mb: int = 10) -> '_FakeUpload':
         """Create large mock file for testing"""
-        data = b"x" * (size_mb * 1024 * 1024)
-        mock_file = Mock()
-        mock_file.filename = f"large_file_{size_mb}mb.jpg"
-        mock_file.content_type = "image/jpeg"
-        mock_file.read.return_value = data
-        mock_file.stream = BytesIO(data)
-        return mock_file
+        # Shared payload; the BytesIO reuses its buffer until written to
+        return _FakeUpload(_large_payload(size_mb), f"large_file_{size_mb}mb.jpg", "image/jpeg")
+
+
+_SIMPLE_RESPONSE = [{"generated_text": "Hello World!"}]
 
 
 class MockDeepSeekModel:
     """Mock DeepSeek model for testing"""
     
-    def __init__(self, responses: Dict[str, str] = None):
+    def __init__(self, responses: Dict[str, str] = None, simulate_delay: float = 0.0):
         self.responses = responses or {
             "default": "Extracted text from image"
         }
+        # Built once; callers treat model output as read-only
+        self._default_response = [{"generated_text": self.responses.get("default", "Mock OCR result")}]
+        self.simulate_delay = simulate_delay
         self.call_count = 0
         self.last_input = None
     
@@ -73,39 +167,118 @@ class MockDeepSeekModel:
         self.call_count += 1
         self.last_input = inputs
         
-        # Simulate processing delay
-        import time
-        time.sleep(0.1)
+        # Simulate processing delay only when a test asks for it
+        if self.simulate_delay:
+            time.sleep(self.simulate_delay)
+        
+        # Pick the response from an explicit {"mode": ...} when given; only
+        # otherwise stringify the inputs, once, for the legacy keyword match
+        mode = inputs.get("mode") if isinstance(inputs, dict) else None
+        if mode is None:
+            text = str(inputs)
+            mode = "simple" if "simple" in text else "error" if "error" in text else None
         
         # Return mock response
-        if "simple" in str(inputs):
-            return [{"generated_text": "Hello World!"}]
-        elif "error" in str(inputs):
+        if mode == "simple":
+            return _SIMPLE_RESPONSE
+        elif mode == "error":
             raise Exception("Mock model error")
         else:
-            return [{"generated_text": self.responses.get("default", "Mock OCR result")}]
+            return self._default_response
+
+
+# Processor output shared by every mock processor call; treat as read-only
+_PROCESSOR_OUTPUT = {
+    "input_ids": [[1, 2, 3]],
+    "pixel_values": [[[0.5, 0.5, 0.5]]]
+}
+
+
+class _MockProcessor:
+    """Processor stand-in returning the canned model inputs"""
+    
+    def __call__(self, *args, **kwargs):
+        return _PROCESSOR_OUTPUT
+
+
+class _MockAutoModel:
+    """AutoModel stand-in whose from_pretrained always yields the same model"""
+    
+    def __init__(self):
+        self.model = MockDeepSeekModel()
+    
+    def from_pretrained(self, *args, **kwargs):
+        return self.model
+
+
+class _MockAutoProcessor:
+    """AutoProcessor stand-in; calling it or from_pretrained yields a processor"""
+    
+    def __call__(self, *args, **kwargs):
+        return _MockProcessor()
+    
+    def from_pretrained(self, *args, **kwargs):
+        return _MockProcessor()
 
 
 class MockTransformersComponents:
-    """Mock transformers components for testing"""
+    """Mock transformers components for testing (plain classes, no Mock trees)"""
     
     @staticmethod
     def mock_auto_model():
         """Mock AutoModel"""
-        mock_model = Mock()
-        mock_model.from_pretrained.return_value = MockDeepSeekModel()
-        return mock_model
+        return _MockAutoModel()
     
     @staticmethod
     def mock_auto_processor():
         """Mock AutoProcessor"""
-        mock_processor = Mock()
-        mock_processor.from_pretrained.return_value = Mock()
-        mock_processor.return_value.return_value = {
-            "input_ids": [[1, 2, 3]],
-            "pixel_values": [[[0.5, 0.5, 0.5]]]
-        }
-        return mock_processor
+        return _MockAutoProcessor()
+
+
+# Encoded bodies kept for repeat uploads; larger payloads are encoded every time
+_MULTIPART_CACHE_SIZE = 8
+_MULTIPART_CACHE_MAX_PAYLOAD = 1 << 20
+_multipart_cache: 'OrderedDict[tuple, Tuple[bytes, str]]' = OrderedDict()
+_multipart_cache_lock = threading.Lock()
+
+
+def _multipart_cache_key(files: tuple, fields: tuple) -> Optional[tuple]:
+    """Digest-based cache key, or None when the upload should not be cached"""
+    if sum(len(data) for _, data, _ in files) > _MULTIPART_CACHE_MAX_PAYLOAD:
+        return None
+    key = (
+        tuple((name, hashlib.blake2b(data, digest_size=16).digest(), filename)
+              for name, data, filename in files),
+        fields,
+    )
+    try:
+        hash(key)
+    except TypeError:
+        return None  # Unhashable form values
+    return key
+
+
+def _encode_multipart(files: tuple, fields: tuple) -> Tuple[bytes, str]:
+    """Encode (name, data, filename) files and form fields, reusing bodies of small repeat uploads"""
+    key = _multipart_cache_key(files, fields)
+    if key is not None:
+        with _multipart_cache_lock:
+            if key in _multipart_cache:
+                _multipart_cache.move_to_end(key)
+                return _multipart_cache[key]
+    
+    values = MultiDict(fields)
+    for name, data, filename in files:
+        values.add(name, FileStorage(BytesIO(data), filename=filename))
+    boundary, body = encode_multipart(values)
+    encoded = body, f'multipart/form-data; boundary={boundary}'
+    
+    if key is not None:
+        with _multipart_cache_lock:
+            _multipart_cache[key] = encoded
+            if len(_multipart_cache) > _MULTIPART_CACHE_SIZE:
+                _multipart_cache.popitem(last=False)
+    return encoded
 
 
 class APITestClient:
@@ -118,28 +291,27 @@ class APITestClient:
     def upload_image(self, image_data: bytes, filename: str = "test.jpg", 
                     extract_format: str = "plain", **kwargs) -> Dict[str, Any]:
         """Upload image for OCR processing"""
-        data = {
-            'image': (BytesIO(image_data), filename),
-            'extract_format': extract_format
-        }
-        data.update(kwargs)
+        fields = {'extract_format': extract_format, **kwargs}
+        body, content_type = _encode_multipart(
+            (('image', image_data, filename),), tuple(fields.items())
+        )
         
         response = self.client.post('/api/ocr/upload', 
-                                   data=data,
-                                   content_type='multipart/form-data')
+                                   data=body,
+                                   content_type=content_type)
         return response.get_json(), response.status_code
     
     def upload_multiple_images(self, images: List[tuple], **kwargs) -> Dict[str, Any]:
         """Upload multiple images for batch processing"""
-        data = {}
-        for i, (image_data, filename) in enumerate(images):
-            data[f'images[{i}]'] = (BytesIO(image_data), filename)
-        
-        data.update(kwargs)
+        files = tuple(
+            (f'images[{i}]', image_data, filename)
+            for i, (image_data, filename) in enumerate(images)
+        )
+        body, content_type = _encode_multipart(files, tuple(kwargs.items()))
         
         response = self.client.post('/api/ocr/batch',
-                                   data=data,
-                                   content_type='multipart/form-data')
+                                   data=body,
+                                   content_type=content_type)
         return response.get_json(), response.status_code
     
     def get_health(self) -> Dict[str, Any]:
@@ -154,16 +326,16 @@ class ConfigTestHelper:
     @staticmethod
     def create_temp_config(config_data: Dict[str, Any]) -> str:
         """Create temporary config file"""
-        import yaml
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False)
-        yaml.dump(config_data, temp_file)
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False,
+                                                buffering=1 << 16, dir=_TMPFS)
+        yaml.dump(config_data, temp_file, Dumper=YamlDumper)
         temp_file.close()
         return temp_file.name
     
     @staticmethod
     def create_invalid_config() -> str:
         """Create invalid config file"""
-        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False)
+        temp_file = tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False, dir=_TMPFS)
         temp_file.write("invalid: yaml: content: [")
         temp_file.close()
         return temp_file.name
@@ -175,24 +347,41 @@ class ConfigTestHelper:
             os.unlink(config_path)
 
 
+@functools.lru_cache(maxsize=32)
+def _cached_image(width: int, height: int, color: str = 'white', fmt: str = 'JPEG') -> bytes:
+    """Encode a solid test image once per size, color and format"""
+    if Image is None:
+        raise ImportError("Pillow is required to encode test images")
+    
+    if fmt == 'JPEG' and simplejpeg is not None:
+        # libjpeg-turbo straight from a pixel array, skipping PIL's save dispatch
+        pixels = np.full((height, width, 3), ImageColor.getrgb(color), dtype=np.uint8)
+        return simplejpeg.encode_jpeg(pixels, quality=85, colorspace='RGB')
+    
+    image = Image.new('RGB', (width, height), color)
+    image_bytes = BytesIO()
+    image.save(image_bytes, format=fmt)
+    return image_bytes.getvalue()
+
+
+@functools.lru_cache(maxsize=32)
+def _fallback_jpeg(width: int, height: int) -> bytes:
+    """Stand-in JPEG bytes (SOI ... EOI markers) used when Pillow is missing"""
+    return b"\xff\xd8\xff\xe0" + b"\x00" * (width * height // 10) + b"\xff\xd9"
+
+
 class ImageTestHelper:
     """Helper for image testing"""
     
     @staticmethod
     def create_test_image_bytes(width: int = 100, height: int = 100, 
                                color: str = 'white') -> bytes:
-        """Create test image as bytes"""
+        """Create test image as bytes (cached; the same object is returned for equal arguments)"""
         try:
-            from PIL import Image
-            import io
-            
-            image = Image.new('RGB', (width, height), color)
-            image_bytes = io.BytesIO()
-            image.save(image_bytes, format='JPEG')
-            return image_bytes.getvalue()
+            return _cached_image(width, height, color)
         except ImportError:
             # Return mock image bytes if PIL not available
-            return b"fake_jpeg_header\xff\xd8\xff\xe0" + b"x" * (width * height // 10)
+            return _fallback_jpeg(width, height)
     
     @staticmethod
     def create_corrupted_image_bytes() -> bytes:
@@ -203,34 +392,42 @@ class ImageTestHelper:
     def create_large_image_bytes(size_mb: int = 5) -> bytes:
         """Create large image bytes"""
         base_image = ImageTestHelper.create_test_image_bytes(1000, 1000)
-        # Repeat the image data to reach desired size
-        multiplier = (size_mb * 1024 * 1024) // len(base_image) + 1
-        return base_image * multiplier
+        # Repeat the image data to exactly the desired size; join allocates once
+        full, remainder = divmod(size_mb * 1024 * 1024, len(base_image))
+        return b"".join([base_image] * full + [base_image[:remainder]])
 
 
 class PerformanceTestHelper:
     """Helper for performance testing"""
     
+    __slots__ = ('_names', '_starts', '_durations')
+    
     def __init__(self):
-        self.metrics = {}
+        # Operation name -> slot in the nanosecond arrays; a start of 0 means not running
+        self._names: Dict[str, int] = {}
+        self._starts = array.array('q')
+        self._durations = array.array('q')
     
     def start_timer(self, operation: str):
         """Start timing an operation"""
-        import time
-        self.metrics[operation] = {'start': time.time()}
+        idx = self._names.setdefault(operation, len(self._names))
+        if idx == len(self._starts):
+            self._starts.append(0)
+            self._durations.append(0)
+        self._durations[idx] = 0
+        self._starts[idx] = time.perf_counter_ns()
     
     def end_timer(self, operation: str):
         """End timing an operation"""
-        import time
-        if operation in self.metrics:
-            self.metrics[operation]['end'] = time.time()
-            self.metrics[operation]['duration'] = (
-                self.metrics[operation]['end'] - self.metrics[operation]['start']
-            )
+        idx = self._names.get(operation)
+        if idx is not None and self._starts[idx]:
+            self._durations[idx] = time.perf_counter_ns() - self._starts[idx]
+            self._starts[idx] = 0
     
     def get_duration(self, operation: str) -> float:
-        """Get operation duration"""
-        return self.metrics.get(operation, {}).get('duration', 0.0)
+        """Get operation duration in seconds"""
+        idx = self._names.get(operation)
+        return 0.0 if idx is None else self._durations[idx] / 1e9
     
     def assert_performance(self, operation: str, max_duration: float):
         """Assert that operation completed within time limit"""
@@ -238,45 +435,85 @@ class PerformanceTestHelper:
         assert duration <= max_duration, f"Operation {operation} took {duration}s, expected <= {max_duration}s"
 
 
+class _LogCapture(logging.Handler):
+    """Handler appending level/message/module records to its helper's buffer"""
+    
+    def __init__(self, helper: 'LogTestHelper'):
+        super().__init__()
+        self.helper = helper
+    
+    def emit(self, record):
+        message = record.getMessage()
+        self.helper.captured_logs.append({
+            'level': record.levelname,
+            'message': message,
+            'module': record.module
+        })
+        # Secondary indexes for assert_log_contains
+        self.helper._by_level.setdefault(record.levelname, []).append(message)
+        self.helper._messages.add(message)
+
+
 class LogTestHelper:
     """Helper for testing logging functionality"""
     
+    __slots__ = ('captured_logs', '_cursor', '_by_level', '_messages', '_handler', '_loggers')
+    
     def __init__(self):
-        self.captured_logs = []
+        self.captured_logs = []  # List, so new_logs() can index from its cursor
+        self._cursor = 0
+        self._by_level = {}
+        self._messages = set()
+        self._handler = _LogCapture(self)
+        self._loggers = []
     
     def capture_logs(self, logger_name: str = None):
         """Capture logs for testing"""
-        import logging
-        
-        class LogCapture(logging.Handler):
-            def __init__(self, helper):
-                super().__init__()
-                self.helper = helper
-            
-            def emit(self, record):
-                self.helper.captured_logs.append({
-                    'level': record.levelname,
-                    'message': record.getMessage(),
-                    'module': record.module
-                })
-        
         logger = logging.getLogger(logger_name) if logger_name else logging.getLogger()
-        handler = LogCapture(self)
-        logger.addHandler(handler)
-        return handler
-    
-    def assert_log_contains(self, message: str, level: str = None):
-        """Assert that logs contain specific message"""
-        for log in self.captured_logs:
-            if message in log['message']:
-                if level is None or log['level'] == level:
-                    return True
+        # One shared handler, attached at most once per logger
+        if self._handler not in logger.handlers:
+            logger.addHandler(self._handler)
+            self._loggers.append(logger)
+        return self._handler
+    
+    def release(self):
+        """Detach the capture handler from every logger it was added to"""
+        while self._loggers:
+            self._loggers.pop().removeHandler(self._handler)
+    
+    def new_logs(self) -> Iterator[Dict[str, str]]:
+        """Yield log records captured since the last call"""
+        logs = self.captured_logs
+        while self._cursor < len(logs):
+            record = logs[self._cursor]
+            self._cursor += 1
+            yield record
+    
+    def assert_log_contains(self, message: str, level: str = None, incremental: bool = False):
+        """Assert that logs contain specific message; incremental only checks logs not yet seen"""
+        if incremental:
+            candidates = (
+                log['message'] for log in self.new_logs()
+                if level is None or log['level'] == level
+            )
+        elif level is None:
+            # Exact match is a set lookup; otherwise fall back to a substring scan
+            if message in self._messages:
+                return True
+            candidates = self._messages
+        else:
+            candidates = self._by_level.get(level, ())
+        if any(message in log_message for log_message in candidates):
+            return True
         raise AssertionError(f"Log message '{message}' not found" + 
                            (f" at level {level}" if level else ""))
     
     def clear_logs(self):
         """Clear captured logs"""
         self.captured_logs.clear()
+        self._cursor = 0
+        self._by_level.clear()
+        self._messages.clear()
 
 
 # Global test helpers instance